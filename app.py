@@ -1,4 +1,7 @@
 # app.py
+import asyncio
+import time
+
 import streamlit as st
 
 from config import (
@@ -9,19 +12,29 @@ from config import (
 )
 from core.openai_client import get_client, call_llm
 from core.financial_data import (
-    download_all_tickers,
+    refresh_all_tickers,
     intraday_high_low,
     compute_volatility,
     compute_momentum,
     seasonality_by_month,
 )
+from core.columnar_cache import (
+    write_columnar_cache,
+    open_columnar_cache,
+)
+from core.cross_section import update_cross_section
+from core.intraday_stream import IntradayStream
+from core.alert_engine import AlertEngine, format_alert
+from core.news_archive import get_news_archive
 from core.news_fetcher import (
-    fetch_news_for_ticker,
-    format_news_for_prompt,
+    fetch_news_async,
+    news_cache_info,
+    build_news_prompt,
 )
 from core.analysis_engine import (
-    generate_macro_context,
-    format_context_for_llm,
+    cached_macro_context,
+    scan_universe,
+    format_scan_for_chat,
 )
 
 # -----------------------------
@@ -126,6 +139,23 @@ custom_css = """
 """
 st.markdown(custom_css, unsafe_allow_html=True)
 
+# -----------------------------
+# RECURSOS COMPARTIDOS ENTRE SESIONES
+# -----------------------------
+@st.cache_resource
+def get_alert_engine(name: str) -> AlertEngine:
+    # Un motor de alertas por fuente ("diario" / "intradía"), compartido entre sesiones
+    return AlertEngine(name=name)
+
+
+@st.cache_resource
+def get_intraday_stream() -> IntradayStream:
+    # Un solo buffer intradía (memoria fija) para todas las sesiones
+    stream = IntradayStream(ALL_TICKERS)
+    stream.add_listener(get_alert_engine("intradía").on_bar)
+    return stream
+
+
 # -----------------------------
 # ESTADO DE SESIÓN
 # -----------------------------
@@ -144,7 +174,10 @@ if "messages" not in st.session_state:
     ]
 
 if "market_data" not in st.session_state:
-    st.session_state.market_data = {}
+    # Cache mmap compartido: todas las sesiones leen los mismos arrays
+    st.session_state.market_data = open_columnar_cache()
+    # Covarianza compartida: si ya está al día no se recalcula nada
+    update_cross_section(st.session_state.market_data)
 
 if "news_articles" not in st.session_state:
     st.session_state.news_articles = {}
@@ -158,6 +191,12 @@ if "macro_context" not in st.session_state:
 if "macro_summary" not in st.session_state:
     st.session_state.macro_summary = {}
 
+if "alert_seq" not in st.session_state:
+    # Cada sesión lee las alertas posteriores a su llegada
+    st.session_state.alert_seq = {
+        name: get_alert_engine(name).last_seq for name in ("diario", "intradía")
+    }
+
 # -----------------------------
 # SIDEBAR: CONFIG + BOTONES
 # -----------------------------
@@ -185,6 +224,9 @@ with st.sidebar:
     btn_load_news = st.button("📰 Cargar noticias del ticker")
     btn_summarize_news = st.button("🧠 Resumir noticias con IA")
     btn_macro = st.button("📈 Generar análisis macro y enviarlo al chat")
+    btn_intraday = st.button("⏱️ Intradía en vivo del ticker")
+    btn_scan = st.button("🌐 Escanear todo el universo")
+    btn_news_archive = st.button("🗄️ Actualizar archivo de noticias")
 
 # -----------------------------
 # CHAT INPUT (ABAJO)
@@ -198,10 +240,29 @@ user_input = st.chat_input("Escribe tu pregunta para FinChat")
 # 1) Descargar datos
 if btn_download:
     with st.spinner("Descargando datos históricos..."):
-        st.session_state.market_data = download_all_tickers()
+        report = refresh_all_tickers(ALL_TICKERS)
+        arrived = time.perf_counter()
+        alert_engine = get_alert_engine("diario")
+        for t, df in report["data"].items():
+            alert_engine.on_history(t, df, arrived)
+        write_columnar_cache(report["data"])
+        st.session_state.market_data = open_columnar_cache()
+        # Beta y dispersión: solo entran las barras nuevas
+        update_cross_section(st.session_state.market_data)
+
+    download_msg = (
+        f"✅ Datos históricos listos: {len(report['data'])}/{len(ALL_TICKERS)} "
+        f"tickers en {report['elapsed']:.2f}s ({report['rows_fetched']} barras nuevas).\n"
+        f"Memoria del histórico: {report['bytes_before'] / 1e6:.2f} MB → "
+        f"{report['bytes_after'] / 1e6:.2f} MB."
+    )
+    if report["errors"]:
+        failed = ", ".join(f"{t} ({err})" for t, err in report["errors"].items())
+        download_msg += f"\n\n⚠️ Fallaron: {failed}"
+
     st.session_state.messages.append({
         "role": "assistant",
-        "content": "✅ Datos históricos de SPY + 7 Magníficas descargados correctamente."
+        "content": download_msg,
     })
 
 # 2) Snapshot de SPY -> mensaje de chat
@@ -247,10 +308,29 @@ if btn_spy_snapshot:
             "content": snapshot_text,
         })
 
-# 3) Cargar noticias
+# 3) Cargar noticias (asyncio: se pintan por ticker a medida que llegan)
 if btn_load_news:
-    articles = fetch_news_for_ticker(selected_ticker, limit=5)
-    st.session_state.news_articles[selected_ticker] = articles
+    progress = st.empty()
+    progress_lines = []
+
+    async def load_news() -> None:
+        # El ticker elegido va en su propia petición; el resto, en una sola agrupada
+        async for res in fetch_news_async(
+            ALL_TICKERS, limit=5, priority=selected_ticker, group_size=None
+        ):
+            st.session_state.news_articles[res["ticker"]] = res["articles"]
+            get_news_archive().add(res["ticker"], res["articles"])
+            if res["error"]:
+                status = f"⚠️ {res['error']}"
+            else:
+                origin = "cache" if res["cached"] else f"{res['elapsed']:.1f}s"
+                status = f"{len(res['articles'])} noticias ({origin})"
+            progress_lines.append(f"- **{res['ticker']}**: {status}")
+            progress.markdown("📰 Cargando noticias...\n\n" + "\n".join(progress_lines))
+
+    asyncio.run(load_news())
+    progress.empty()
+    articles = st.session_state.news_articles.get(selected_ticker, [])
 
     if not articles:
         txt = (
@@ -273,6 +353,12 @@ if btn_load_news:
 
         txt = "\n".join(lines)
 
+    cache = news_cache_info()
+    txt += (
+        f"\n\n_Cache de noticias: {cache['hits']} aciertos de "
+        f"{cache['hits'] + cache['misses']} consultas ({cache['hit_ratio']:.0%})._"
+    )
+
     st.session_state.messages.append({
         "role": "assistant",
         "content": txt,
@@ -300,7 +386,7 @@ if btn_summarize_news:
                 ),
             })
         else:
-            news_text = format_news_for_prompt(selected_ticker, articles)
+            news_text, dedupe_report = build_news_prompt(selected_ticker, articles)
             system_prompt = (
                 "Eres un analista financiero especializado en bolsa de valores. "
                 "Lee la lista de noticias recientes y devuelve un resumen en español "
@@ -320,7 +406,12 @@ if btn_summarize_news:
 
             st.session_state.messages.append({
                 "role": "assistant",
-                "content": f"🧠 **Resumen de noticias para {selected_ticker}:**\n\n{summary}",
+                "content": (
+                    f"🧠 **Resumen de noticias para {selected_ticker}:**\n\n{summary}\n\n"
+                    f"_{dedupe_report['articles_before']} noticias → "
+                    f"{dedupe_report['articles_after']} tras colapsar duplicados "
+                    f"(~{dedupe_report['tokens_saved']} tokens ahorrados)._"
+                ),
             })
 
 # 5) Análisis macro + explicación con IA
@@ -335,8 +426,11 @@ if btn_macro:
         })
     else:
         df_ticker = st.session_state.market_data[selected_ticker]
-        ctx = generate_macro_context(selected_ticker, df_ticker)
-        ctx_text = format_context_for_llm(ctx)
+        ctx, ctx_text = cached_macro_context(
+            selected_ticker,
+            df_ticker,
+            benchmark_df=st.session_state.market_data.get(SPY_TICKER),
+        )
 
         st.session_state.macro_context[selected_ticker] = ctx
         st.session_state.macro_summary[selected_ticker] = ctx_text
@@ -375,7 +469,71 @@ if btn_macro:
                 ),
             })
 
-# 6) Mensaje libre del usuario (chat_input)
+# 6) Intradía en vivo (buffer circular de barras de minutos)
+if btn_intraday:
+    stream = get_intraday_stream()
+    with st.spinner("Actualizando barras intradía..."):
+        new_bars = stream.poll()
+    snap = stream.snapshot(selected_ticker)
+    session = snap["session"]
+
+    if not session:
+        txt = f"⏱️ No hay barras intradía disponibles para **{selected_ticker}** ahora mismo."
+    else:
+        txt_lines = [
+            f"⏱️ **Intradía de {selected_ticker}** ({snap['interval']}, "
+            f"{snap['bars']} barras en buffer, {new_bars.get(selected_ticker, 0)} nuevas):",
+            f"- Última barra: **{snap['last_bar']}**",
+            f"- Sesión {session['date']}: Open `{session['open']:.2f}` | High `{session['high']:.2f}` | "
+            f"Low `{session['low']:.2f}` | Último `{session['close']:.2f}`",
+            f"- Volatilidad anualizada (barras cerradas): **{snap['volatility']:.2%}**",
+            f"- Momentum {MOMENTUM_WINDOW} barras: **{snap['momentum']:.2%}**",
+        ]
+        if snap["anomaly_info"]["anomaly"]:
+            txt_lines.append(
+                f"- ⚠️ Barra anómala: {snap['anomaly_info']['sigma']:.2f} σ"
+            )
+        txt = "\n".join(txt_lines)
+
+    st.session_state.messages.append({
+        "role": "assistant",
+        "content": txt,
+    })
+
+# 7) Escaneo de todo el universo (un solo mensaje con el ranking)
+if btn_scan:
+    if not st.session_state.market_data:
+        st.session_state.messages.append({
+            "role": "assistant",
+            "content": (
+                "⚠️ Aún no tengo datos de mercado.\n\n"
+                "Pulsa primero en `🔄 Descargar datos (SPY + 7)` en el sidebar."
+            ),
+        })
+    else:
+        scan = scan_universe(st.session_state.market_data)
+        st.session_state.messages.append({
+            "role": "assistant",
+            "content": format_scan_for_chat(scan),
+        })
+
+# 8) Archivo local de noticias (backfill incremental desde el cursor de cada ticker)
+if btn_news_archive:
+    archive = get_news_archive()
+    with st.spinner("Actualizando archivo de noticias..."):
+        added = archive.backfill(ALL_TICKERS)
+
+    detail = ", ".join(f"{t}: {n}" for t, n in added.items() if n)
+    st.session_state.messages.append({
+        "role": "assistant",
+        "content": (
+            f"🗄️ Archivo de noticias actualizado: **{sum(added.values())}** titulares nuevas "
+            f"({detail or 'sin novedades'}). Total archivado: {archive.count()}.\n\n"
+            "Puedo citarlas en el chat sin volver a consultar la API."
+        ),
+    })
+
+# 9) Mensaje libre del usuario (chat_input)
 if user_input is not None and user_input.strip():
     st.session_state.messages.append({"role": "user", "content": user_input})
 
@@ -411,8 +569,7 @@ if user_input is not None and user_input.strip():
         if SPY_TICKER in st.session_state.market_data:
             try:
                 df_spy_ctx = st.session_state.market_data[SPY_TICKER]
-                ctx_spy = generate_macro_context(SPY_TICKER, df_spy_ctx)
-                ctx_spy_text = format_context_for_llm(ctx_spy)
+                _, ctx_spy_text = cached_macro_context(SPY_TICKER, df_spy_ctx)
 
                 extra_context = (
                     "\n\nContexto cuantitativo actual para SPY (calculado en Python):\n"
@@ -423,6 +580,19 @@ if user_input is not None and user_input.strip():
             except Exception as e:
                 extra_context = f"\n\n(No se pudo generar contexto cuantitativo por un error interno: {e})"
 
+        # Titulares del archivo local relacionados con la pregunta (sin red)
+        archived = get_news_archive().search(user_input, limit=5)
+        if archived:
+            extra_context += (
+                "\n\nNoticias archivadas relacionadas con la pregunta (archivo local):\n"
+                + "\n".join(
+                    f"- [{(art['published'] or 'sin fecha')[:10]}] "
+                    f"{art['publisher'] or 'Fuente desconocida'}: {art['title']} ({art['link']})"
+                    for art in archived
+                )
+                + "\nSi las usas, cítalas con su fecha y fuente."
+            )
+
         messages_for_llm = [
             {"role": "system", "content": base_system + extra_context}
         ]
@@ -438,6 +608,16 @@ if user_input is not None and user_input.strip():
 
         st.session_state.messages.append({"role": "assistant", "content": response_text})
 
+# 10) Alertas disparadas por barras nuevas -> mensajes del chat
+for name, seq in st.session_state.alert_seq.items():
+    engine = get_alert_engine(name)
+    for alert in engine.since(seq):
+        st.session_state.messages.append({
+            "role": "assistant",
+            "content": format_alert(alert),
+        })
+    st.session_state.alert_seq[name] = engine.last_seq
+
 # -----------------------------
 # RENDER FINAL: HEADER + CHAT
 # -----------------------------
@@ -1,4 +1,5 @@
 # config.py
+import os
 
 # ETF principal
 SPY_TICKER = "SPY"
@@ -16,3 +17,65 @@ DEFAULT_INTERVAL = "1d"      # datos diarios
 # Ventanas para indicadores
 VOLATILITY_WINDOW = 20       # días
 MOMENTUM_WINDOW = 10         # días
+COVARIANCE_WINDOW = 60       # días para beta / correlación contra SPY
+RISK_WINDOW = 252            # días para drawdown máximo y VaR / CVaR históricos
+ATR_WINDOW = 14
+VAR_CONFIDENCE = 0.95
+
+# Proveedor de datos de mercado: "yfinance" o "synthetic" (offline, para perfilar)
+MARKET_DATA_PROVIDER = os.getenv("MARKET_DATA_PROVIDER", "yfinance")
+SYNTHETIC_SEED = 42
+SYNTHETIC_ORIGIN = "2015-01-02"    # primera barra de las series sintéticas
+SYNTHETIC_HISTORY_DAYS = None      # None = todo desde SYNTHETIC_ORIGIN
+
+# Almacenamiento local de precios (histórico incremental)
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+PRICE_STORE_URL = os.getenv(
+    "PRICE_STORE_URL",
+    "sqlite:///" + os.path.join(DATA_DIR, "prices.db"),
+)
+USE_PRICE_STORE = True       # download_all_tickers lee a través del store
+COLUMNAR_CACHE_DIR = os.path.join(DATA_DIR, "columnar")  # cache mmap compartido
+DERIVED_CACHE_SIZE = 256     # históricos con rendimientos memoizados (LRU)
+MACRO_CACHE_SIZE = 256       # contextos macro memoizados (LRU, compartido entre sesiones)
+COMPACT_HISTORY = True       # float32 / uint32 y sin 'Adj Close' en memoria
+
+# Planificador de descargas para universos grandes (S&P 500 y más)
+SCHEDULER_CHUNK_SIZE = 50          # tickers por petición agrupada
+SCHEDULER_REQUESTS_PER_SEC = 5     # peticiones HTTP por segundo (yfinance hace una por símbolo)
+SCHEDULER_BURST = 50               # peticiones permitidas en ráfaga (un chunk)
+SCHEDULER_MAX_WORKERS = 2          # chunks en proceso a la vez (yf.download va de a una)
+SCHEDULER_MAX_RETRIES = 3
+SCHEDULER_PROGRESS_FILE = os.path.join(DATA_DIR, "download_progress.json")
+
+# Backtesting del contexto macro
+BACKTEST_HORIZON = 5               # días hacia adelante para medir aciertos
+BACKTEST_NEUTRAL_BAND = 0.05       # |score - 0.5| por debajo de esto no cuenta como señal
+BACKTEST_MAX_WORKERS = None        # procesos del barrido (None = todos los núcleos)
+
+# Modo intradía (barras de minutos en un buffer circular de tamaño fijo)
+INTRADAY_INTERVAL = "5m"
+INTRADAY_BUFFER_SIZE = 2000        # ~25 sesiones de barras de 5 minutos
+
+# Alertas sobre barras nuevas
+ALERT_VOL_SPIKE_RATIO = 1.5        # vol. corta / vol. de referencia para disparar alerta
+ALERT_BASELINE_WINDOW = 60         # barras de la volatilidad de referencia
+ALERT_HISTORY_SIZE = 500           # alertas recientes guardadas en memoria
+
+# Noticias (MarketAux)
+NEWS_TIMEOUT = 10                  # segundos por petición
+NEWS_LOOKBACK_DAYS = 3             # ventana 'published_after'
+NEWS_PAGE_LIMIT = 50               # artículos por petición (según el plan de MarketAux)
+NEWS_BULK_ROUNDS = 2               # peticiones máximas de fetch_news_bulk
+NEWS_POOL_SIZE = 10                # conexiones keep-alive del Session compartido
+NEWS_CACHE_TTL = 15 * 60           # segundos que una consulta de noticias se considera fresca
+NEWS_CACHE_FILE = os.path.join(DATA_DIR, "news_cache.json")
+NEWS_ASYNC_CONCURRENCY = 4         # peticiones de noticias en vuelo a la vez (modo asyncio)
+NEWS_DEADLINE = 8                  # segundos máximos por petición en modo asyncio
+NEWS_DUP_THRESHOLD = 0.6           # similitud (Jaccard estimada) de titulares para colapsarlos
+NEWS_SHINGLE_SIZE = 5              # caracteres por shingle del titular
+NEWS_MINHASH_PERMS = 64            # funciones hash de la firma MinHash
+NEWS_MINHASH_BANDS = 16            # bandas LSH (64 / 16 = 4 filas por banda)
+NEWS_ARCHIVE_PATH = os.path.join(DATA_DIR, "news_archive.db")
+NEWS_ARCHIVE_START_DAYS = 30       # días hacia atrás del primer backfill de un ticker
+NEWS_ARCHIVE_MAX_PAGES = 5         # páginas por petición agrupada en cada backfill
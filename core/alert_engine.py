@@ -0,0 +1,272 @@
+# core/alert_engine.py
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    ALERT_VOL_SPIKE_RATIO,
+    ALERT_BASELINE_WINDOW,
+    ALERT_HISTORY_SIZE,
+)
+from core.analysis_engine import MOMENTUM_BANDS, MOMENTUM_LABELS, momentum_band
+from core.financial_data import price_column
+from core.panel import ANOMALY_SIGMA
+from core.streaming_indicators import ANOMALY_WINDOW, StreamingIndicators, RollingWindowStats
+
+
+def _regime(band: int) -> int:
+    # Bandas 0–1 alcistas, 2 neutral, 3–4 bajistas
+    return 1 if band <= 1 else (0 if band == 2 else -1)
+
+
+# -------------------------------------------------------------
+# 1) ESTADO DE UN TICKER
+# -------------------------------------------------------------
+class _TickerState:
+    def __init__(self, baseline_window: int):
+        self.indicators = StreamingIndicators()
+        self.baseline = RollingWindowStats(baseline_window)
+        self.last_date: Optional[pd.Timestamp] = None
+        self.band: Optional[int] = None
+        self.spiking = False
+        self.returns = 0
+        # Régimen y pico previos a la última barra, por si hay que reemplazarla
+        self._band_before: Optional[int] = None
+        self._spiking_before = False
+
+    def update(self, date: pd.Timestamp, close: float, bands: tuple) -> None:
+        self._band_before, self._spiking_before = self.band, self.spiking
+        previous = self.indicators.last_close
+        self.indicators.update(close)
+        if not math.isnan(previous):
+            self.baseline.push(close / previous - 1.0)
+            self.returns += 1
+        self.last_date = date
+
+        momentum = self.indicators.momentum()
+        self.band = None if math.isnan(momentum) else int(momentum_band(momentum, bands))
+
+    def replace_last(self, close: float, bands: tuple) -> Optional[int]:
+        """
+        Cambia el cierre de la última barra y deja el régimen y el pico como
+        estaban antes de ella. Retorna esa banda previa.
+        """
+        self.band, self.spiking = self._band_before, self._spiking_before
+        self.indicators.replace_last(close)
+        if self.returns:
+            self.baseline.replace_last(self.indicators.last_return)
+
+        momentum = self.indicators.momentum()
+        band_before = self.band
+        self.band = None if math.isnan(momentum) else int(momentum_band(momentum, bands))
+        return band_before
+
+    @property
+    def warm(self) -> bool:
+        # Ventanas de z-score y momentum llenas: antes, unas pocas barras bastan para "anomalías"
+        return self.returns >= max(ANOMALY_WINDOW, self.indicators.mom_window)
+
+    def vol_ratio(self) -> float:
+        if self.baseline.count < self.baseline.size:
+            return float("nan")
+        base = self.baseline.std
+        short = self.indicators.volatility(annualize=False)
+        return short / base if base > 0 else float("nan")
+
+
+# -------------------------------------------------------------
+# 2) MOTOR DE ALERTAS
+# -------------------------------------------------------------
+class AlertEngine:
+    """
+    Evalúa reglas de alerta en cada barra nueva de cada ticker, en O(1)
+    por barra (StreamingIndicators + una ventana de referencia):
+    - anomaly: |z| del último rendimiento >= anomaly_sigma
+    - regime: el momentum pasa de alcista / neutral / bajista a otro régimen
+    - vol_spike: vol. corta / vol. de referencia cruza vol_spike_ratio
+
+    La primera vez que se ve un ticker su histórico solo inicializa el
+    estado (sin alertas); un ticker que llega barra a barra (on_bar) no
+    alerta hasta llenar sus ventanas de rendimientos. Una barra con la misma
+    fecha que la última vista (una barra diaria parcial que luego cierra)
+    la reemplaza y se vuelve a evaluar. Las alertas quedan en un historial
+    con número de secuencia para que cada sesión lea las suyas con since().
+    La latencia de cada alerta se mide desde la llegada de la barra.
+    """
+
+    def __init__(
+        self,
+        name: str = "diario",
+        anomaly_sigma: float = ANOMALY_SIGMA,
+        vol_spike_ratio: float = ALERT_VOL_SPIKE_RATIO,
+        baseline_window: int = ALERT_BASELINE_WINDOW,
+        bands: tuple = MOMENTUM_BANDS,
+        history_size: int = ALERT_HISTORY_SIZE,
+    ):
+        self.name = name
+        self.anomaly_sigma = anomaly_sigma
+        self.vol_spike_ratio = vol_spike_ratio
+        self.baseline_window = baseline_window
+        self.bands = bands
+        self._states: dict[str, _TickerState] = {}
+        self._alerts: deque = deque(maxlen=history_size)
+        self._latencies: deque = deque(maxlen=history_size)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    # ----- ingesta -----
+    def prime(self, ticker: str, df) -> None:
+        """
+        Inicializa (o reinicia) el estado del ticker con su histórico, sin alertas.
+        """
+        state = _TickerState(self.baseline_window)
+        dates = pd.to_datetime(price_column(df, "date"))
+        for date, close in zip(dates, price_column(df, "Close")):
+            state.update(pd.Timestamp(date), float(close), self.bands)
+        state.spiking = state.vol_ratio() >= self.vol_spike_ratio
+        with self._lock:
+            self._states[ticker] = state
+
+    def on_bar(self, ticker: str, date, close: float, arrived: Optional[float] = None) -> list[dict]:
+        """
+        Procesa una barra. Si tiene la fecha de la última vista y otro
+        cierre, la reemplaza. 'arrived' es el time.perf_counter() de su
+        llegada. Retorna las alertas disparadas.
+        """
+        arrived = time.perf_counter() if arrived is None else arrived
+        date = pd.Timestamp(date)
+        close = float(close)
+
+        with self._lock:
+            state = self._states.setdefault(ticker, _TickerState(self.baseline_window))
+            if math.isnan(close) or (state.last_date is not None and date < state.last_date):
+                return []
+
+            if date == state.last_date:
+                if close == state.indicators.last_close:
+                    return []
+                previous_band = state.replace_last(close, self.bands)
+            else:
+                previous_band = state.band
+                state.update(date, close, self.bands)
+            if not state.warm:
+                return []
+            fired = self._evaluate(ticker, date, state, previous_band)
+
+            for alert in fired:
+                alert["latency_ms"] = (time.perf_counter() - arrived) * 1000
+                self._seq += 1
+                alert["seq"] = self._seq
+                self._alerts.append(alert)
+                self._latencies.append(alert["latency_ms"])
+        return fired
+
+    def on_history(self, ticker: str, df, arrived: Optional[float] = None) -> list[dict]:
+        """
+        Procesa solo las barras de df desde la última vista (esa misma se
+        reemplaza si cambió su cierre). Un ticker nuevo se inicializa con
+        todo df sin disparar alertas.
+        """
+        arrived = time.perf_counter() if arrived is None else arrived
+        state = self._states.get(ticker)
+        if state is None or state.last_date is None:
+            self.prime(ticker, df)
+            return []
+
+        dates = pd.DatetimeIndex(pd.to_datetime(price_column(df, "date")))
+        closes = price_column(df, "Close")
+        first = int(dates.searchsorted(state.last_date, side="left"))
+        fired = []
+        for i in range(first, len(dates)):
+            fired.extend(self.on_bar(ticker, dates[i], closes[i], arrived))
+        return fired
+
+    # ----- reglas -----
+    def _evaluate(
+        self,
+        ticker: str,
+        date: pd.Timestamp,
+        state: _TickerState,
+        previous_band: Optional[int],
+    ) -> list[dict]:
+        fired = []
+
+        anomaly = state.indicators.anomaly()
+        if abs(anomaly["sigma"]) >= self.anomaly_sigma:
+            fired.append({
+                "rule": "anomaly",
+                "sigma": anomaly["sigma"],
+                "last_ret": anomaly.get("last_ret"),
+            })
+
+        if previous_band is not None and state.band is not None:
+            if _regime(previous_band) != _regime(state.band):
+                fired.append({
+                    "rule": "regime",
+                    "from": MOMENTUM_LABELS[previous_band],
+                    "to": MOMENTUM_LABELS[state.band],
+                    "momentum": state.indicators.momentum(),
+                })
+
+        ratio = state.vol_ratio()
+        spiking = ratio >= self.vol_spike_ratio
+        if spiking and not state.spiking:
+            fired.append({"rule": "vol_spike", "ratio": ratio})
+        state.spiking = spiking
+
+        for alert in fired:
+            alert.update({"engine": self.name, "ticker": ticker, "date": date})
+        return fired
+
+    # ----- consulta -----
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def since(self, seq: int) -> list[dict]:
+        """
+        Alertas con número de secuencia mayor que 'seq' (las que aún siguen en el historial).
+        """
+        with self._lock:
+            return [a for a in self._alerts if a["seq"] > seq]
+
+    def latency_stats(self) -> Dict[str, Any]:
+        """
+        Latencia (ms) desde la llegada de la barra hasta la alerta.
+        """
+        with self._lock:
+            values = np.array(self._latencies)
+        if len(values) == 0:
+            return {"count": 0, "p50_ms": float("nan"), "p95_ms": float("nan"), "max_ms": float("nan")}
+        return {
+            "count": len(values),
+            "p50_ms": float(np.percentile(values, 50)),
+            "p95_ms": float(np.percentile(values, 95)),
+            "max_ms": float(values.max()),
+        }
+
+
+# -------------------------------------------------------------
+# 3) TEXTO PARA EL CHAT
+# -------------------------------------------------------------
+def format_alert(alert: Dict[str, Any]) -> str:
+    """
+    Mensaje de chat de una alerta.
+    """
+    date = alert["date"]
+    when = date.date() if date == date.normalize() else date.strftime("%Y-%m-%d %H:%M")
+    head = f"🚨 **{alert['ticker']}** ({alert['engine']}, {when})"
+    if alert["rule"] == "anomaly":
+        body = f"rendimiento anómalo de {alert['last_ret']:.2%} ({alert['sigma']:+.2f} σ)"
+    elif alert["rule"] == "regime":
+        body = f"cambio de régimen de momentum: {alert['from']} → {alert['to']} ({alert['momentum']:.2%})"
+    else:
+        body = f"pico de volatilidad: {alert['ratio']:.2f}× la volatilidad de referencia"
+    return f"{head}: {body} · latencia {alert['latency_ms']:.2f} ms"
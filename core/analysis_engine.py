@@ -1,29 +1,76 @@
 # core/analysis_engine.py
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
 from typing import Dict, Any
 
 from core.financial_data import (
+    history_key,
+    is_cacheable,
+    last_date,
+    cached_returns,
     compute_volatility,
     compute_momentum,
     intraday_high_low,
     seasonality_by_month,
 )
+from core.cross_section import relative_to_benchmark, panel_beta, shared_cross_section_info
+from core.panel import build_price_panel, panel_indicators
+from core.risk_metrics import ticker_risk
+from config import (
+    SPY_TICKER,
+    COVARIANCE_WINDOW,
+    VOLATILITY_WINDOW,
+    MOMENTUM_WINDOW,
+    MACRO_CACHE_SIZE,
+    RISK_WINDOW,
+    ATR_WINDOW,
+    VAR_CONFIDENCE,
+)
+
+# Umbrales por defecto del contexto macro (parametrizables para backtesting)
+SCORE_WEIGHTS = (0.4, 0.6)            # peso de volatilidad y de momentum en overall_score
+VOL_SCORE_RANGE = (0.10, 0.40)        # volatilidad anualizada -> score 0–1
+MOM_SCORE_RANGE = (-0.05, 0.05)       # momentum -> score 0–1
+MOMENTUM_BANDS = (0.05, 0.01, -0.01, -0.05)
+MOMENTUM_LABELS = (
+    "📈 Momentum fuertemente alcista",
+    "↗️ Momentum moderadamente alcista",
+    "➡️ Momentum neutral",
+    "↘️ Momentum moderadamente bajista",
+    "📉 Momentum fuertemente bajista",
+)
+
+_macro_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_macro_lock = threading.Lock()
+macro_cache_stats = {"hits": 0, "misses": 0}
 
 
 # -------------------------------------------------------------
 # 1) NORMALIZACIÓN DE MÉTRICAS
 # -------------------------------------------------------------
+def score_normalize_array(values, low: float, high: float) -> np.ndarray:
+    """
+    Versión vectorizada de score_normalize: recorta (values - low) / (high - low)
+    a [0, 1] elemento a elemento. Los NaN valen 0.5 (score neutral).
+    """
+    values = np.asarray(values, dtype=float)
+    with np.errstate(invalid="ignore"):
+        return np.where(np.isnan(values), 0.5, np.clip((values - low) / (high - low), 0, 1))
+
+
 def score_normalize(value: float, low: float, high: float) -> float:
     """
     Normaliza un valor en el rango [low, high] y lo convierte en score 0–1.
     Funciona como un indicador de intensidad.
     """
-    if value is None or np.isnan(value):
+    if value is None:
         return 0.5
-    return max(0, min(1, (value - low) / (high - low)))
+    return float(score_normalize_array(value, low, high))
 
 
 # -------------------------------------------------------------
@@ -34,16 +81,16 @@ def detect_return_anomaly(df: pd.DataFrame) -> Dict[str, Any]:
     Detecta si el rendimiento del último día es inusualmente alto o bajo.
     Usa desviaciones estándar del último mes.
     """
-    df = df.copy()
-    df["ret"] = df["Close"].pct_change()
-    recent = df["ret"].tail(20).dropna()
+    ret = cached_returns(df)
+    recent = ret[-20:]
+    recent = recent[~np.isnan(recent)]
 
     if len(recent) < 5:
         return {"anomaly": False, "sigma": 0}
 
     mean = recent.mean()
-    std = recent.std()
-    last_ret = recent.iloc[-1]
+    std = recent.std(ddof=1)
+    last_ret = recent[-1]
     z = (last_ret - mean) / std if std > 0 else 0
 
     return {
@@ -56,23 +103,73 @@ def detect_return_anomaly(df: pd.DataFrame) -> Dict[str, Any]:
 # -------------------------------------------------------------
 # 3) CLASIFICACIÓN DE MOMENTUM
 # -------------------------------------------------------------
-def classify_momentum(momentum: float) -> str:
-    if momentum > 0.05:
-        return "📈 Momentum fuertemente alcista"
-    elif momentum > 0.01:
-        return "↗️ Momentum moderadamente alcista"
-    elif momentum > -0.01:
-        return "➡️ Momentum neutral"
-    elif momentum > -0.05:
-        return "↘️ Momentum moderadamente bajista"
-    else:
-        return "📉 Momentum fuertemente bajista"
+def momentum_band(momentum, bands: tuple = MOMENTUM_BANDS) -> np.ndarray:
+    """
+    Índice en MOMENTUM_LABELS de cada momentum según 'bands' (cortes de
+    mayor a menor). Un NaN cae en la última banda, como en classify_momentum.
+    """
+    momentum = np.asarray(momentum, dtype=float)
+    with np.errstate(invalid="ignore"):
+        conditions = [momentum > cut for cut in bands]
+    return np.select(conditions, np.arange(len(bands)), default=len(bands))
+
+
+def classify_momentum_array(momentum, bands: tuple = MOMENTUM_BANDS) -> np.ndarray:
+    """
+    Versión vectorizada de classify_momentum: array de etiquetas.
+    """
+    return np.asarray(MOMENTUM_LABELS, dtype=object)[momentum_band(momentum, bands)]
+
+
+def classify_momentum(momentum: float, bands: tuple = MOMENTUM_BANDS) -> str:
+    """
+    Etiqueta el momentum según 'bands' (cortes de mayor a menor).
+    """
+    return MOMENTUM_LABELS[int(momentum_band(momentum, bands))]
+
+
+def overall_score_array(
+    volatility,
+    momentum,
+    weights: tuple = SCORE_WEIGHTS,
+    vol_range: tuple = VOL_SCORE_RANGE,
+    mom_range: tuple = MOM_SCORE_RANGE,
+) -> np.ndarray:
+    """
+    Versión vectorizada de overall_score para arrays de volatilidad y momentum.
+    """
+    score_vol = score_normalize_array(volatility, *vol_range)
+    score_mom = score_normalize_array(momentum, *mom_range)
+    return np.round(score_vol * weights[0] + score_mom * weights[1], 3)
+
+
+def overall_score(
+    volatility: float,
+    momentum: float,
+    weights: tuple = SCORE_WEIGHTS,
+    vol_range: tuple = VOL_SCORE_RANGE,
+    mom_range: tuple = MOM_SCORE_RANGE,
+) -> float:
+    """
+    Score general 0–1: combinación ponderada de volatilidad y momentum normalizados.
+    """
+    return float(overall_score_array(volatility, momentum, weights, vol_range, mom_range))
 
 
 # -------------------------------------------------------------
 # 4) GENERAR CONTEXTO MACRO PARA EL DÍA
 # -------------------------------------------------------------
-def generate_macro_context(ticker: str, df: pd.DataFrame) -> Dict[str, Any]:
+def generate_macro_context(
+    ticker: str,
+    df: pd.DataFrame,
+    benchmark_df: pd.DataFrame | None = None,
+    vol_window: int = VOLATILITY_WINDOW,
+    mom_window: int = MOMENTUM_WINDOW,
+    weights: tuple = SCORE_WEIGHTS,
+    vol_range: tuple = VOL_SCORE_RANGE,
+    mom_range: tuple = MOM_SCORE_RANGE,
+    bands: tuple = MOMENTUM_BANDS,
+) -> Dict[str, Any]:
     """
     Genera un análisis macro simple:
     - Volatilidad actual vs normal
@@ -80,15 +177,18 @@ def generate_macro_context(ticker: str, df: pd.DataFrame) -> Dict[str, Any]:
     - Detección de anomalías
     - Rango del último día
     - Estacionalidad del mes
+    - Beta y correlación contra SPY (si se pasa benchmark_df)
+    - Dispersión del universo (si la covarianza compartida está al día)
+    - Riesgo: drawdown máximo, ATR y VaR / CVaR históricos
     """
     # Métricas básicas
-    volatility = compute_volatility(df)
-    momentum = compute_momentum(df)
+    volatility = compute_volatility(df, window=vol_window)
+    momentum = compute_momentum(df, window=mom_window)
     day_info = intraday_high_low(df)
     anomaly_info = detect_return_anomaly(df)
 
     # Estacionalidad mensual
-    current_month = df["date"].iloc[-1].month
+    current_month = last_date(df).month
     seasonality = seasonality_by_month(df)
     season_row = seasonality[seasonality["month"] == current_month]
 
@@ -97,14 +197,28 @@ def generate_macro_context(ticker: str, df: pd.DataFrame) -> Dict[str, Any]:
     else:
         avg_month_return = None
 
+    # Relación con el ETF y dispersión del universo: de la covarianza
+    # compartida si está al día con df; si no, beta sin estado
+    cross_info = shared_cross_section_info(ticker, last_date(df))
+    dispersion = cross_info["dispersion"] if cross_info is not None else None
+    benchmark_info = None
+    if benchmark_df is not None and ticker != SPY_TICKER:
+        if cross_info is not None:
+            benchmark_info = cross_info["benchmark_info"]
+        else:
+            benchmark_info = relative_to_benchmark(df, benchmark_df)
+
+    # Métricas de riesgo
+    risk_info = ticker_risk(ticker, df)
+
     # Clasificación momentum
-    momentum_summary = classify_momentum(momentum)
+    momentum_summary = classify_momentum(momentum, bands)
 
     # Construcción de texto
     macro_text = f"""
 Análisis macro del día para {ticker}:
 
-• Volatilidad anualizada (20 días): {volatility:.2%}
+• Volatilidad anualizada ({vol_window} días): {volatility:.2%}
 • {momentum_summary} (momentum {momentum:.2%})
 • Rango del último día: High {day_info['high']:.2f}, Low {day_info['low']:.2f}
 
@@ -120,22 +234,45 @@ Análisis macro del día para {ticker}:
     if avg_month_return is not None:
         macro_text += f"• Estacionalidad del mes: retorno promedio {avg_month_return:.2%}\n"
 
-    # Score general (esto lo puede usar el LLM)
-    score_vol = score_normalize(volatility, 0.10, 0.40)
-    score_mom = score_normalize(momentum, -0.05, 0.05)
+    # Relación con SPY
+    if benchmark_info is not None and not np.isnan(benchmark_info["beta"]):
+        macro_text += (
+            f"• Beta vs {SPY_TICKER} ({COVARIANCE_WINDOW}d): {benchmark_info['beta']:.2f} "
+            f"(correlación {benchmark_info['correlation']:.2f})\n"
+        )
+    if dispersion is not None and not np.isnan(dispersion):
+        macro_text += f"• Dispersión del universo en el último día: {dispersion:.2%}\n"
 
-    overall_score = round((score_vol * 0.4 + score_mom * 0.6), 3)
+    # Riesgo
+    if not np.isnan(risk_info["max_drawdown"]):
+        macro_text += (
+            f"• Drawdown máximo ({RISK_WINDOW}d): {risk_info['max_drawdown']:.2%} "
+            f"(actual {risk_info['drawdown']:.2%})\n"
+        )
+    if not np.isnan(risk_info["var"]):
+        macro_text += (
+            f"• VaR {VAR_CONFIDENCE:.0%} diario: {risk_info['var']:.2%}, "
+            f"CVaR: {risk_info['cvar']:.2%}\n"
+        )
+
+    # Score general (esto lo puede usar el LLM)
+    score = overall_score(volatility, momentum, weights, vol_range, mom_range)
 
     return {
         "ticker": ticker,
+        "vol_window": vol_window,
+        "mom_window": mom_window,
         "volatility": volatility,
         "momentum": momentum,
         "momentum_summary": momentum_summary,
         "day_info": day_info,
         "anomaly_info": anomaly_info,
         "avg_month_return": avg_month_return,
+        "benchmark_info": benchmark_info,
+        "dispersion": dispersion,
+        "risk_info": risk_info,
         "macro_text": macro_text,
-        "overall_score": overall_score,
+        "overall_score": score,
     }
 
 
@@ -148,8 +285,8 @@ def format_context_for_llm(context: Dict[str, Any]) -> str:
     """
     txt = (
         f"Ticker: {context['ticker']}\n"
-        f"Volatilidad 20d: {context['volatility']:.2%}\n"
-        f"Momentum 10d: {context['momentum']:.2%}\n"
+        f"Volatilidad {context.get('vol_window', VOLATILITY_WINDOW)}d: {context['volatility']:.2%}\n"
+        f"Momentum {context.get('mom_window', MOMENTUM_WINDOW)}d: {context['momentum']:.2%}\n"
         f"{context['momentum_summary']}\n"
         f"Último rango: High {context['day_info']['high']:.2f}, "
         f"Low {context['day_info']['low']:.2f}\n"
@@ -161,9 +298,140 @@ def format_context_for_llm(context: Dict[str, Any]) -> str:
         )
     if context["avg_month_return"] is not None:
         txt += f"Estacionalidad mensual: {context['avg_month_return']:.2%}\n"
+    bench = context.get("benchmark_info")
+    if bench is not None and not np.isnan(bench["beta"]):
+        txt += f"Beta vs {SPY_TICKER}: {bench['beta']:.2f} (correlación {bench['correlation']:.2f})\n"
+    dispersion = context.get("dispersion")
+    if dispersion is not None and not np.isnan(dispersion):
+        txt += f"Dispersión del universo (último día): {dispersion:.2%}\n"
+    risk = context.get("risk_info")
+    if risk is not None:
+        if not np.isnan(risk["max_drawdown"]):
+            txt += f"Drawdown máximo {RISK_WINDOW}d: {risk['max_drawdown']:.2%} (actual {risk['drawdown']:.2%})\n"
+        if not np.isnan(risk["atr"]):
+            txt += f"ATR {ATR_WINDOW}d: {risk['atr']:.2f} ({risk['atr_pct']:.2%} del precio)\n"
+        if not np.isnan(risk["var"]):
+            txt += f"VaR {VAR_CONFIDENCE:.0%} diario: {risk['var']:.2%} | CVaR: {risk['cvar']:.2%}\n"
 
     txt += f"\nResumen macro del día:\n{context['macro_text']}\n"
 
     txt += f"Score general (0–1): {context['overall_score']}\n"
 
     return txt
+
+
+# -------------------------------------------------------------
+# 6) CONTEXTO MACRO MEMOIZADO (COMPARTIDO ENTRE SESIONES)
+# -------------------------------------------------------------
+def cached_macro_context(
+    ticker: str,
+    df: pd.DataFrame,
+    benchmark_df: pd.DataFrame | None = None,
+    vol_window: int = VOLATILITY_WINDOW,
+    mom_window: int = MOMENTUM_WINDOW,
+) -> tuple[Dict[str, Any], str]:
+    """
+    generate_macro_context + format_context_for_llm con cache LRU a nivel de
+    proceso. La clave es el ticker, la versión del histórico (última barra),
+    la del benchmark y las ventanas, así que mientras los datos no cambien
+    se reutiliza el resultado sin recalcular nada. Con históricos sin
+    ticker no se usa el cache. Retorna (contexto, texto). No modificar: se comparten entre llamadas.
+    """
+    bench_key = history_key(benchmark_df) if benchmark_df is not None else None
+    key = (ticker, history_key(df), bench_key, vol_window, mom_window)
+    if not is_cacheable(key[1]) or (bench_key is not None and not is_cacheable(bench_key)):
+        ctx = generate_macro_context(
+            ticker, df, benchmark_df=benchmark_df, vol_window=vol_window, mom_window=mom_window
+        )
+        return ctx, format_context_for_llm(ctx)
+
+    with _macro_lock:
+        cached = _macro_cache.get(key)
+        if cached is not None:
+            _macro_cache.move_to_end(key)
+            macro_cache_stats["hits"] += 1
+            return cached
+        macro_cache_stats["misses"] += 1
+
+    ctx = generate_macro_context(
+        ticker,
+        df,
+        benchmark_df=benchmark_df,
+        vol_window=vol_window,
+        mom_window=mom_window,
+    )
+    result = (ctx, format_context_for_llm(ctx))
+
+    with _macro_lock:
+        _macro_cache[key] = result
+        while len(_macro_cache) > MACRO_CACHE_SIZE:
+            _macro_cache.popitem(last=False)
+    return result
+
+
+# -------------------------------------------------------------
+# 7) ESCANEO DE TODO EL UNIVERSO EN UNA PASADA
+# -------------------------------------------------------------
+def scan_universe(data: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Contexto macro resumido de todos los tickers a la vez: alinea el universo
+    en un panel y calcula volatilidad, momentum, anomalía, beta vs SPY y el
+    mismo overall_score de generate_macro_context, de forma vectorizada.
+    Retorna una tabla ordenada por overall_score, |sigma| y momentum.
+    """
+    panel = build_price_panel(data)
+    ind = panel_indicators(panel)
+    rel = panel_beta(panel)
+
+    vol = ind["volatility"].to_numpy()
+    mom = ind["momentum"].to_numpy()
+
+    table = pd.DataFrame({
+        "ticker": panel.columns,
+        "close": panel.ffill().iloc[-1].to_numpy(),
+        "volatility": vol,
+        "momentum": mom,
+        "momentum_summary": classify_momentum_array(mom),
+        "sigma": ind["sigma"].to_numpy(),
+        "anomaly": ind["anomaly"].to_numpy(),
+        "beta": rel["beta"].to_numpy(),
+        "overall_score": overall_score_array(vol, mom),
+    })
+    table["abs_sigma"] = table["sigma"].abs()
+    table = (
+        table.sort_values(["overall_score", "abs_sigma", "momentum"], ascending=False)
+        .drop(columns="abs_sigma")
+        .reset_index(drop=True)
+    )
+    return table
+
+
+def format_scan_for_chat(table: pd.DataFrame, top: int | None = None) -> str:
+    """
+    Convierte el ranking de scan_universe en un único mensaje de chat.
+    """
+    if top is not None:
+        table = table.head(top)
+
+    view = pd.DataFrame({
+        "Ticker": table["ticker"],
+        "Score": table["overall_score"].map(lambda x: f"{x:.3f}"),
+        "Vol": table["volatility"].map(lambda x: f"{x:.1%}"),
+        "Mom": table["momentum"].map(lambda x: f"{x:+.2%}"),
+        "σ": table["sigma"].map(lambda x: f"{x:+.2f}"),
+        "Beta": table["beta"].map(lambda x: "-" if np.isnan(x) else f"{x:.2f}"),
+    })
+
+    lines = [
+        f"**Escaneo del universo ({len(table)} tickers), ordenado por score:**",
+        "```",
+        view.to_string(index=False),
+        "```",
+    ]
+    flagged = table[table["anomaly"]]
+    if not flagged.empty:
+        lines.append(
+            "⚠️ Anomalías: "
+            + ", ".join(f"{t} ({s:+.2f} σ)" for t, s in zip(flagged["ticker"], flagged["sigma"]))
+        )
+    return "\n".join(lines)
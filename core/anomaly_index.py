@@ -0,0 +1,131 @@
+# core/anomaly_index.py
+from __future__ import annotations
+
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.panel import ANOMALY_SIGMA, build_price_panel, panel_rolling
+
+
+# -------------------------------------------------------------
+# ÍNDICE DE ANOMALÍAS SOBRE TODO EL HISTÓRICO
+# -------------------------------------------------------------
+class AnomalyIndex:
+    """
+    Eventos de rendimiento anómalo (|z| >= min_sigma) de todas las barras de
+    todos los tickers. El z-score de cada barra se calcula igual que en
+    detect_return_anomaly, pero con una sola pasada rodante sobre el panel.
+    Por ticker se guardan arrays ordenados por fecha (fechas, sigma,
+    rendimiento), así que las consultas por rango usan searchsorted y no
+    vuelven a recorrer el histórico.
+    """
+
+    def __init__(self, min_sigma: float = ANOMALY_SIGMA):
+        self.min_sigma = min_sigma
+        self.dates: dict[str, np.ndarray] = {}
+        self.sigma: dict[str, np.ndarray] = {}
+        self.ret: dict[str, np.ndarray] = {}
+        self.last_bar: dict[str, pd.Timestamp] = {}
+
+    @classmethod
+    def from_panel(cls, panel: pd.DataFrame, min_sigma: float = ANOMALY_SIGMA) -> "AnomalyIndex":
+        index = cls(min_sigma)
+        rolling = panel_rolling(panel)
+        z = rolling["zscore"].to_numpy()
+        ret = rolling["ret"].to_numpy()
+        dates = panel.index.to_numpy(dtype="datetime64[ns]")
+
+        with np.errstate(invalid="ignore"):
+            flagged = np.abs(z) >= min_sigma
+        for j, ticker in enumerate(panel.columns):
+            rows = np.flatnonzero(flagged[:, j])
+            index.dates[ticker] = dates[rows]
+            index.sigma[ticker] = z[rows, j]
+            index.ret[ticker] = ret[rows, j]
+            valid = np.flatnonzero(~np.isnan(panel.iloc[:, j].to_numpy()))
+            index.last_bar[ticker] = pd.Timestamp(dates[valid[-1]]) if len(valid) else None
+        return index
+
+    @classmethod
+    def from_data(cls, data: dict, min_sigma: float = ANOMALY_SIGMA) -> "AnomalyIndex":
+        """
+        Construye el índice a partir de { ticker: df }.
+        """
+        return cls.from_panel(build_price_panel(data), min_sigma)
+
+    def __len__(self) -> int:
+        return sum(len(d) for d in self.dates.values())
+
+    def _range(self, ticker: str, start=None, end=None) -> slice:
+        dates = self.dates.get(ticker)
+        if dates is None:
+            return slice(0, 0)
+        lo = 0 if start is None else int(dates.searchsorted(np.datetime64(pd.Timestamp(start), "ns"), "left"))
+        hi = len(dates) if end is None else int(dates.searchsorted(np.datetime64(pd.Timestamp(end), "ns"), "right"))
+        return slice(lo, hi)
+
+    def events(
+        self,
+        ticker: str,
+        start=None,
+        end=None,
+        min_sigma: Optional[float] = None,
+    ) -> pd.DataFrame:
+        """
+        Eventos de un ticker entre start y end (inclusive), opcionalmente
+        solo los de |sigma| >= min_sigma.
+        """
+        rng = self._range(ticker, start, end)
+        dates = self.dates.get(ticker, np.array([], dtype="datetime64[ns]"))[rng]
+        sigma = self.sigma.get(ticker, np.array([]))[rng]
+        ret = self.ret.get(ticker, np.array([]))[rng]
+        if min_sigma is not None:
+            keep = np.abs(sigma) >= min_sigma
+            dates, sigma, ret = dates[keep], sigma[keep], ret[keep]
+        return pd.DataFrame({"date": dates, "sigma": sigma, "ret": ret})
+
+    def last_event(
+        self,
+        ticker: str,
+        min_sigma: Optional[float] = None,
+        before=None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Último evento del ticker (hasta 'before', inclusive) con
+        |sigma| >= min_sigma. Retorna None si no hay ninguno.
+        """
+        rng = self._range(ticker, None, before)
+        sigma = self.sigma.get(ticker, np.array([]))[rng]
+        threshold = self.min_sigma if min_sigma is None else min_sigma
+        hits = np.flatnonzero(np.abs(sigma) >= threshold)
+        if len(hits) == 0:
+            return None
+
+        i = rng.start + hits[-1]
+        return {
+            "ticker": ticker,
+            "date": pd.Timestamp(self.dates[ticker][i]),
+            "sigma": float(self.sigma[ticker][i]),
+            "ret": float(self.ret[ticker][i]),
+        }
+
+    def count(self, ticker: str, start=None, end=None) -> int:
+        """
+        Número de eventos del ticker en el rango (sin copiar arrays).
+        """
+        rng = self._range(ticker, start, end)
+        return rng.stop - rng.start
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Todos los eventos del universo en una tabla ticker/date/sigma/ret.
+        """
+        frames = [
+            pd.DataFrame({"ticker": t, "date": self.dates[t], "sigma": self.sigma[t], "ret": self.ret[t]})
+            for t in self.dates
+        ]
+        if not frames:
+            return pd.DataFrame(columns=["ticker", "date", "sigma", "ret"])
+        return pd.concat(frames, ignore_index=True).sort_values(["date", "ticker"], ignore_index=True)
@@ -0,0 +1,230 @@
+# core/backtester.py
+from __future__ import annotations
+
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    VOLATILITY_WINDOW,
+    MOMENTUM_WINDOW,
+    BACKTEST_HORIZON,
+    BACKTEST_NEUTRAL_BAND,
+    BACKTEST_MAX_WORKERS,
+)
+from core.analysis_engine import (
+    SCORE_WEIGHTS,
+    VOL_SCORE_RANGE,
+    MOM_SCORE_RANGE,
+    MOMENTUM_BANDS,
+    MOMENTUM_LABELS,
+    momentum_band,
+    overall_score_array,
+)
+from core.panel import ANOMALY_SIGMA, build_price_panel, panel_rolling
+
+DEFAULT_PARAMS = {
+    "vol_window": VOLATILITY_WINDOW,
+    "mom_window": MOMENTUM_WINDOW,
+    "weights": SCORE_WEIGHTS,
+    "vol_range": VOL_SCORE_RANGE,
+    "mom_range": MOM_SCORE_RANGE,
+    "bands": MOMENTUM_BANDS,
+}
+
+
+# -------------------------------------------------------------
+# 1) CONTEXTO MACRO PUNTO A PUNTO (SIN LOOK-AHEAD)
+# -------------------------------------------------------------
+def _score_and_band(vol: np.ndarray, mom: np.ndarray, params: dict) -> tuple[np.ndarray, np.ndarray]:
+    """
+    overall_score y banda de momentum (índice de MOMENTUM_LABELS, -1 sin dato)
+    para arrays de volatilidad y momentum.
+    """
+    score = overall_score_array(vol, mom, params["weights"], params["vol_range"], params["mom_range"])
+    band = np.where(np.isnan(mom), -1, momentum_band(mom, params["bands"]))
+    return score, band
+
+
+def macro_history(panel: pd.DataFrame, **params) -> dict[str, pd.DataFrame]:
+    """
+    Contexto macro de cada fecha × ticker tal como se habría calculado ese
+    día (cada fila usa solo barras hasta esa fecha): 'volatility',
+    'momentum', 'zscore', 'overall_score' y 'band'.
+    Los parámetros no indicados toman los valores de generate_macro_context.
+    """
+    params = {**DEFAULT_PARAMS, **params}
+    rolling = panel_rolling(panel, params["vol_window"], params["mom_window"])
+    vol = rolling["volatility"].to_numpy()
+    mom = rolling["momentum"].to_numpy()
+    score, band = _score_and_band(vol, mom, params)
+
+    return {
+        "volatility": rolling["volatility"],
+        "momentum": rolling["momentum"],
+        "zscore": rolling["zscore"],
+        "overall_score": pd.DataFrame(score, index=panel.index, columns=panel.columns),
+        "band": pd.DataFrame(band, index=panel.index, columns=panel.columns),
+    }
+
+
+def ticker_macro_history(panel: pd.DataFrame, ticker: str, **params) -> pd.DataFrame:
+    """
+    Historial del contexto macro de un ticker: una fila por fecha con las
+    mismas métricas que generate_macro_context.
+    """
+    history = macro_history(panel[[ticker]], **params)
+    band = history["band"][ticker].to_numpy()
+    with np.errstate(invalid="ignore"):
+        anomaly = np.abs(history["zscore"][ticker].to_numpy()) >= ANOMALY_SIGMA
+
+    return pd.DataFrame({
+        "date": panel.index,
+        "volatility": history["volatility"][ticker].to_numpy(),
+        "momentum": history["momentum"][ticker].to_numpy(),
+        "momentum_summary": [MOMENTUM_LABELS[b] if b >= 0 else None for b in band],
+        "sigma": history["zscore"][ticker].to_numpy(),
+        "anomaly": anomaly,
+        "overall_score": history["overall_score"][ticker].to_numpy(),
+    })
+
+
+# -------------------------------------------------------------
+# 2) MÉTRICAS DE ACIERTO
+# -------------------------------------------------------------
+def forward_returns(panel: pd.DataFrame, horizon: int = BACKTEST_HORIZON) -> np.ndarray:
+    """
+    Rendimiento de cada fecha a 'horizon' barras hacia adelante (NaN al final).
+    """
+    values = panel.to_numpy(dtype=float)
+    fwd = np.full(values.shape, np.nan)
+    fwd[:-horizon] = values[horizon:] / values[:-horizon] - 1.0
+    return fwd
+
+
+def hit_rates(
+    score: np.ndarray,
+    band: np.ndarray,
+    fwd: np.ndarray,
+    neutral: float = BACKTEST_NEUTRAL_BAND,
+) -> Dict[str, Any]:
+    """
+    Aciertos del contexto frente al rendimiento futuro:
+    - score_hit_rate: score > 0.5 + neutral anticipa subida, < 0.5 - neutral bajada
+    - band_hit_rate: bandas alcistas anticipan subida y bajistas bajada
+    - fwd_bullish / fwd_bearish: rendimiento futuro medio de cada señal
+    """
+    valid = ~np.isnan(fwd) & (band >= 0)
+    up = fwd > 0
+
+    bullish = valid & (score > 0.5 + neutral)
+    bearish = valid & (score < 0.5 - neutral)
+    calls = bullish.sum() + bearish.sum()
+    hits = (bullish & up).sum() + (bearish & ~up).sum()
+
+    band_bull = valid & (band <= 1)
+    band_bear = valid & (band >= 3)
+    band_calls = band_bull.sum() + band_bear.sum()
+    band_hits = (band_bull & up).sum() + (band_bear & ~up).sum()
+
+    fwd_bullish = float(fwd[bullish].mean()) if bullish.any() else float("nan")
+    fwd_bearish = float(fwd[bearish].mean()) if bearish.any() else float("nan")
+    observations = int(valid.sum())
+    return {
+        "observations": observations,
+        "coverage": calls / observations if observations else float("nan"),
+        "score_hit_rate": hits / calls if calls else float("nan"),
+        "band_hit_rate": band_hits / band_calls if band_calls else float("nan"),
+        "fwd_bullish": fwd_bullish,
+        "fwd_bearish": fwd_bearish,
+        "spread": fwd_bullish - fwd_bearish,
+    }
+
+
+# -------------------------------------------------------------
+# 3) BARRIDO DE PARÁMETROS EN PARALELO
+# -------------------------------------------------------------
+def param_grid(**axes) -> list[dict]:
+    """
+    Producto cartesiano de los valores de cada parámetro, p. ej.
+    param_grid(mom_window=[5, 10, 20], weights=[(0.4, 0.6), (0.2, 0.8)]).
+    Los parámetros no indicados toman su valor por defecto.
+    """
+    names = list(axes)
+    return [
+        {**DEFAULT_PARAMS, **dict(zip(names, values))}
+        for values in itertools.product(*(axes[n] for n in names))
+    ]
+
+
+_worker_state: dict = {}
+
+
+def _init_worker(panel: pd.DataFrame, horizon: int, neutral: float) -> None:
+    # Cada proceso recibe el panel una sola vez, no con cada tarea
+    _worker_state["panel"] = panel
+    _worker_state["fwd"] = forward_returns(panel, horizon)
+    _worker_state["neutral"] = neutral
+
+
+def _evaluate_group(group: list[dict]) -> list[dict]:
+    """
+    Evalúa combinaciones que comparten ventanas: las series rodantes se
+    calculan una vez y solo se recombinan scores y bandas.
+    """
+    panel = _worker_state["panel"]
+    fwd = _worker_state["fwd"]
+    rolling = panel_rolling(panel, group[0]["vol_window"], group[0]["mom_window"])
+    vol = rolling["volatility"].to_numpy()
+    mom = rolling["momentum"].to_numpy()
+
+    rows = []
+    for params in group:
+        score, band = _score_and_band(vol, mom, params)
+        rows.append({**params, **hit_rates(score, band, fwd, _worker_state["neutral"])})
+    return rows
+
+
+def run_sweep(
+    data,
+    grid: list[dict],
+    horizon: int = BACKTEST_HORIZON,
+    neutral: float = BACKTEST_NEUTRAL_BAND,
+    max_workers: Optional[int] = BACKTEST_MAX_WORKERS,
+) -> pd.DataFrame:
+    """
+    Backtest de cada combinación de 'grid' sobre todo el histórico de todos
+    los tickers ({ ticker: df } o un panel ya construido). Las combinaciones
+    se agrupan por ventanas y los grupos se reparten en un pool de procesos.
+    Retorna una fila por combinación, ordenada por score_hit_rate.
+    """
+    start_time = time.perf_counter()
+    panel = data if isinstance(data, pd.DataFrame) else build_price_panel(data)
+
+    groups: dict[tuple, list[dict]] = {}
+    for params in grid:
+        params = {**DEFAULT_PARAMS, **params}
+        groups.setdefault((params["vol_window"], params["mom_window"]), []).append(params)
+
+    if max_workers == 1 or len(groups) == 1:
+        _init_worker(panel, horizon, neutral)
+        results = [_evaluate_group(g) for g in groups.values()]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(panel, horizon, neutral),
+        ) as pool:
+            results = list(pool.map(_evaluate_group, groups.values()))
+
+    table = pd.DataFrame([row for rows in results for row in rows])
+    table = table.sort_values("score_hit_rate", ascending=False, ignore_index=True)
+    print(
+        f"[BACKTEST] {len(table)} combinaciones, {panel.shape[1]} tickers × "
+        f"{panel.shape[0]} fechas en {time.perf_counter() - start_time:.1f}s"
+    )
+    return table
@@ -0,0 +1,151 @@
+# core/columnar_cache.py
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import COLUMNAR_CACHE_DIR
+
+# Campos que se guardan por ticker (la fecha va como datetime64[ns] = int64 epoch)
+CACHE_FIELDS = ("date", "Open", "High", "Low", "Close", "Volume")
+
+CURRENT_FILE = "CURRENT"
+
+
+# -------------------------------------------------------------
+# 1) VISTA DE SOLO LECTURA DE UN TICKER
+# -------------------------------------------------------------
+class ColumnarPrices:
+    """
+    Histórico de un ticker como arrays NumPy mapeados en memoria.
+    Se indexa como un DataFrame (prices["Close"]) pero devuelve arrays
+    de solo lectura que comparten las páginas del archivo entre sesiones
+    y procesos, sin copiarlas.
+    """
+
+    def __init__(self, ticker: str, columns: dict[str, np.ndarray]):
+        self.ticker = ticker
+        self._columns = columns
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self._columns[field]
+
+    def __contains__(self, field: str) -> bool:
+        return field in self._columns
+
+    def __len__(self) -> int:
+        return len(self._columns["date"])
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self._columns)
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Copia a un DataFrame normal (para gráficos o código que lo requiera).
+        """
+        return pd.DataFrame({f: np.array(v) for f, v in self._columns.items()})
+
+
+# -------------------------------------------------------------
+# 2) ESCRITURA (UNA VERSIÓN NUEVA POR ACTUALIZACIÓN)
+# -------------------------------------------------------------
+def write_columnar_cache(
+    data: dict[str, pd.DataFrame],
+    root: str = COLUMNAR_CACHE_DIR,
+) -> str:
+    """
+    Escribe { ticker: df } como un .npy por ticker y campo en un directorio
+    de versión nuevo y luego lo publica cambiando el archivo CURRENT de forma
+    atómica. Los lectores que ya tengan la versión anterior mapeada siguen
+    funcionando. Retorna el nombre de la versión publicada.
+    """
+    os.makedirs(root, exist_ok=True)
+    version = f"v{time.time_ns()}"
+    version_dir = os.path.join(root, version)
+
+    manifest = {}
+    for ticker, df in data.items():
+        ticker_dir = os.path.join(version_dir, ticker)
+        os.makedirs(ticker_dir, exist_ok=True)
+        for field in CACHE_FIELDS:
+            if field not in df.columns:
+                continue
+            values = df[field]
+            if field == "date":
+                values = pd.to_datetime(values)
+                if values.dt.tz is not None:
+                    values = values.dt.tz_convert("UTC").dt.tz_localize(None)
+                arr = values.to_numpy(dtype="datetime64[ns]")
+            else:
+                arr = values.to_numpy()
+            np.save(os.path.join(ticker_dir, f"{field}.npy"), arr)
+        manifest[ticker] = len(df)
+
+    with open(os.path.join(version_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+
+    tmp_current = os.path.join(root, CURRENT_FILE + ".tmp")
+    with open(tmp_current, "w") as f:
+        f.write(version)
+    os.replace(tmp_current, os.path.join(root, CURRENT_FILE))
+
+    # Limpieza: se conserva la versión anterior por si alguien la está leyendo
+    versions = sorted(d for d in os.listdir(root) if d.startswith("v"))
+    for old in versions[:-2]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+
+    return version
+
+
+# -------------------------------------------------------------
+# 3) LECTURA COMPARTIDA (ZERO-COPY)
+# -------------------------------------------------------------
+_opened: dict[str, tuple[str, dict[str, ColumnarPrices]]] = {}
+_opened_lock = threading.Lock()
+
+
+def open_columnar_cache(root: str = COLUMNAR_CACHE_DIR) -> dict[str, ColumnarPrices]:
+    """
+    Abre la versión publicada del cache como { ticker: ColumnarPrices }.
+    Dentro de un proceso todas las sesiones reciben el mismo diccionario;
+    entre procesos se comparten las páginas del sistema operativo.
+    Retorna {} si aún no hay cache.
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return {}
+
+    with _opened_lock:
+        cached = _opened.get(root)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        version_dir = os.path.join(root, version)
+        with open(os.path.join(version_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+
+        data: dict[str, ColumnarPrices] = {}
+        for ticker in manifest:
+            columns = {}
+            for field in CACHE_FIELDS:
+                path = os.path.join(version_dir, ticker, f"{field}.npy")
+                if os.path.exists(path):
+                    columns[field] = np.load(path, mmap_mode="r")
+            data[ticker] = ColumnarPrices(ticker, columns)
+
+        _opened[root] = (version, data)
+        return data
+
@@ -0,0 +1,282 @@
+# core/cross_section.py
+from __future__ import annotations
+
+import threading
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import SPY_TICKER, COVARIANCE_WINDOW
+from core.financial_data import price_column
+from core.panel import build_price_panel, panel_returns
+
+# Cada cuántas actualizaciones se recalculan las sumas desde el buffer
+# para acotar el error de redondeo acumulado (costo amortizado bajo)
+RESYNC_EVERY = 1000
+
+
+# -------------------------------------------------------------
+# COVARIANZA RODANTE N×N INCREMENTAL
+# -------------------------------------------------------------
+class RollingCovariance:
+    """
+    Covarianza de los rendimientos de todos los tickers en los últimos
+    'window' días. Guarda la suma de rendimientos y la suma de productos
+    cruzados: cada barra nueva suma su producto externo y resta el de la
+    barra que sale de la ventana, en O(N²) y sin recorrer el histórico.
+    Las fechas en que falta algún ticker no entran a la ventana.
+    """
+
+    def __init__(self, tickers: list[str], window: int = COVARIANCE_WINDOW):
+        self.tickers = list(tickers)
+        self.window = window
+        n = len(self.tickers)
+        self._buf = np.zeros((window, n))
+        self._pos = 0
+        self._updates = 0
+        self.count = 0
+        self._sum = np.zeros(n)
+        self._cross = np.zeros((n, n))
+        self.last_date: Optional[pd.Timestamp] = None
+        self.last_returns = np.full(n, np.nan)
+
+    @classmethod
+    def from_panel(cls, panel: pd.DataFrame, window: int = COVARIANCE_WINDOW) -> "RollingCovariance":
+        """
+        Inicializa el estado con las últimas 'window' fechas completas del panel.
+        """
+        state = cls(list(panel.columns), window)
+        state.update_from_panel(panel)
+        return state
+
+    def update(self, date, returns: np.ndarray) -> bool:
+        """
+        Agrega el vector de rendimientos de una fecha. Retorna False si la
+        fecha ya estaba incluida o si falta el rendimiento de algún ticker.
+        """
+        date = pd.Timestamp(date)
+        if self.last_date is not None and date <= self.last_date:
+            return False
+        returns = np.asarray(returns, dtype=float)
+        if np.isnan(returns).any():
+            return False
+
+        if self.count == self.window:
+            old = self._buf[self._pos]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+        else:
+            self.count += 1
+
+        self._sum += returns
+        self._cross += np.outer(returns, returns)
+        self._buf[self._pos] = returns
+        self._pos = (self._pos + 1) % self.window
+        self.last_date = date
+        self.last_returns = returns
+
+        self._updates += 1
+        if self._updates >= RESYNC_EVERY:
+            self._resync()
+        return True
+
+    def update_from_panel(self, panel: pd.DataFrame) -> int:
+        """
+        Agrega las fechas del panel posteriores a la última vista.
+        Retorna cuántas fechas entraron a la ventana.
+        """
+        panel = panel[self.tickers]
+        if self.last_date is not None:
+            # Solo las filas nuevas, más la última vista como cierre previo
+            first = max(int(panel.index.searchsorted(self.last_date, side="right")) - 1, 0)
+            returns = panel_returns(panel.iloc[first:]).iloc[1:]
+        else:
+            # Arranque: basta con las últimas 'window' fechas completas
+            returns = panel_returns(panel).dropna().tail(self.window)
+        return sum(self.update(d, r) for d, r in zip(returns.index, returns.to_numpy()))
+
+    def _resync(self) -> None:
+        self._updates = 0
+        rows = self._buf[:self.count]
+        self._sum = rows.sum(axis=0)
+        self._cross = rows.T @ rows
+
+    def cov(self) -> pd.DataFrame:
+        n = self.count
+        if n < 2:
+            values = np.full_like(self._cross, np.nan)
+        else:
+            values = (self._cross - np.outer(self._sum, self._sum) / n) / (n - 1)
+        return pd.DataFrame(values, index=self.tickers, columns=self.tickers)
+
+    def corr(self) -> pd.DataFrame:
+        cov = self.cov().to_numpy()
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = cov / np.outer(std, std)
+        return pd.DataFrame(values, index=self.tickers, columns=self.tickers)
+
+    def beta(self, benchmark: str = SPY_TICKER) -> pd.Series:
+        """
+        Beta de cada ticker contra el benchmark: cov(ticker, bench) / var(bench).
+        """
+        cov = self.cov()
+        var_bench = cov.loc[benchmark, benchmark]
+        return cov[benchmark] / var_bench if var_bench > 0 else cov[benchmark] * np.nan
+
+    def dispersion(self) -> float:
+        """
+        Dispersión de corte transversal: desviación estándar de los
+        rendimientos de la última fecha entre todos los tickers.
+        """
+        if len(self.tickers) < 2 or np.isnan(self.last_returns).any():
+            return float("nan")
+        return float(np.std(self.last_returns, ddof=1))
+
+    def benchmark_info(self, ticker: str, benchmark: str = SPY_TICKER) -> Dict[str, Any]:
+        """
+        Beta y correlación de un ticker con el mismo formato que relative_to_benchmark.
+        """
+        cov = self.cov()
+        var_bench = cov.loc[benchmark, benchmark]
+        cov_tb = cov.loc[ticker, benchmark]
+        beta = cov_tb / var_bench if var_bench > 0 else float("nan")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov_tb / np.sqrt(cov.loc[ticker, ticker] * var_bench)
+        return {"beta": float(beta), "correlation": float(corr), "days": self.count}
+
+    def summary(self, benchmark: str = SPY_TICKER) -> pd.DataFrame:
+        """
+        Tabla por ticker con beta y correlación contra el benchmark.
+        """
+        return pd.DataFrame({
+            "beta": self.beta(benchmark),
+            "corr": self.corr()[benchmark],
+        })
+
+
+# -------------------------------------------------------------
+# ESTADO COMPARTIDO (SE ALIMENTA EN CADA DESCARGA)
+# -------------------------------------------------------------
+_shared: Optional[RollingCovariance] = None
+_shared_lock = threading.Lock()
+
+
+def _rows_since(df, date: pd.Timestamp) -> pd.DataFrame:
+    # Barras desde 'date' (inclusive) sin convertir todo el histórico
+    dates = np.asarray(price_column(df, "date"))
+    first = int(dates.searchsorted(np.datetime64(date, "ns")))
+    return pd.DataFrame({"date": dates[first:], "Close": price_column(df, "Close")[first:]})
+
+
+def update_cross_section(data: dict, window: int = COVARIANCE_WINDOW) -> Optional[RollingCovariance]:
+    """
+    Alimenta la covarianza compartida del proceso con { ticker: df }. Solo
+    se alinean las barras desde la última fecha incluida; si cambia el
+    universo o la ventana (o aún no hay estado) se inicializa de nuevo.
+    """
+    global _shared
+    data = {t: df for t, df in data.items() if len(df) > 0}
+    if not data:
+        return _shared
+    with _shared_lock:
+        state = _shared
+        if (
+            state is None
+            or state.last_date is None
+            or state.window != window
+            or set(state.tickers) != set(data)
+        ):
+            state = RollingCovariance.from_panel(build_price_panel(data), window)
+        else:
+            recent = {t: _rows_since(df, state.last_date) for t, df in data.items()}
+            state.update_from_panel(build_price_panel(recent))
+        _shared = state
+        return state
+
+
+def shared_cross_section_info(
+    ticker: str,
+    as_of,
+    benchmark: str = SPY_TICKER,
+) -> Optional[Dict[str, Any]]:
+    """
+    Beta / correlación del ticker (None si es el benchmark) y dispersión del
+    universo desde la covarianza compartida. Retorna None si el estado no
+    existe, no incluye al ticker o su última fecha no es 'as_of'.
+    """
+    with _shared_lock:
+        state = _shared
+        if (
+            state is None
+            or state.last_date != pd.Timestamp(as_of)
+            or ticker not in state.tickers
+            or benchmark not in state.tickers
+        ):
+            return None
+        return {
+            "benchmark_info": None if ticker == benchmark else state.benchmark_info(ticker, benchmark),
+            "dispersion": state.dispersion(),
+        }
+
+
+# -------------------------------------------------------------
+# BETA DE UN TICKER CONTRA EL BENCHMARK (SIN ESTADO)
+# -------------------------------------------------------------
+def relative_to_benchmark(
+    df,
+    benchmark_df,
+    window: int = COVARIANCE_WINDOW,
+) -> Dict[str, Any]:
+    """
+    Beta y correlación de un ticker contra el benchmark usando las últimas
+    'window' fechas en que ambos tienen rendimiento.
+    """
+    panel = build_price_panel({"asset": df, "bench": benchmark_df})
+    returns = panel_returns(panel).dropna().tail(window).to_numpy()
+    if len(returns) < 2:
+        return {"beta": float("nan"), "correlation": float("nan"), "days": len(returns)}
+
+    cov = np.cov(returns, rowvar=False, ddof=1)
+    var_bench = cov[1, 1]
+    beta = cov[0, 1] / var_bench if var_bench > 0 else float("nan")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov[0, 1] / np.sqrt(cov[0, 0] * var_bench)
+    return {"beta": float(beta), "correlation": float(corr), "days": len(returns)}
+
+
+# -------------------------------------------------------------
+# BETA DE TODO EL PANEL CONTRA EL BENCHMARK (VECTORIZADO)
+# -------------------------------------------------------------
+def panel_beta(
+    panel: pd.DataFrame,
+    benchmark: str = SPY_TICKER,
+    window: int = COVARIANCE_WINDOW,
+) -> pd.DataFrame:
+    """
+    Beta y correlación de cada columna del panel contra el benchmark en las
+    últimas 'window' fechas, usando por ticker solo las fechas en que ambos
+    tienen rendimiento. Retorna un DataFrame indexado por ticker.
+    """
+    if benchmark not in panel.columns:
+        return pd.DataFrame({"beta": np.nan, "corr": np.nan}, index=panel.columns)
+
+    returns = panel_returns(panel).tail(window)
+    x = returns.to_numpy()
+    bench = returns[benchmark].to_numpy()[:, None]
+    mask = ~np.isnan(x) & ~np.isnan(bench)
+    x = np.where(mask, x, np.nan)
+    y = np.where(mask, bench, np.nan)
+    n = mask.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dx = x - np.nanmean(x, axis=0)
+        dy = y - np.nanmean(y, axis=0)
+        cov = np.nansum(dx * dy, axis=0) / (n - 1)
+        var_x = np.nansum(dx ** 2, axis=0) / (n - 1)
+        var_y = np.nansum(dy ** 2, axis=0) / (n - 1)
+        beta = np.where((n >= 2) & (var_y > 0), cov / var_y, np.nan)
+        corr = np.where(n >= 2, cov / np.sqrt(var_x * var_y), np.nan)
+
+    return pd.DataFrame({"beta": beta, "corr": corr}, index=panel.columns)
@@ -0,0 +1,242 @@
+# core/data_providers.py
+from __future__ import annotations
+
+import threading
+import zlib
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    MARKET_DATA_PROVIDER,
+    SYNTHETIC_SEED,
+    SYNTHETIC_ORIGIN,
+    SYNTHETIC_HISTORY_DAYS,
+)
+
+
+# -------------------------------------------------------------
+# 1) UTILIDADES COMUNES
+# -------------------------------------------------------------
+def normalize_history(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deja el DataFrame de yfinance en el formato que usa la app:
+    columnas planas (sin MultiIndex) y la fecha como columna 'date'.
+    """
+    if isinstance(df.columns, pd.MultiIndex):
+        # yfinance devuelve (Price, Ticker) incluso para un solo ticker
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+    df = df.reset_index()
+    df.rename(columns={"Date": "date", "Datetime": "date"}, inplace=True)
+    return df
+
+
+def period_start(period: str) -> Optional[pd.Timestamp]:
+    """
+    Convierte un 'period' de yfinance ('5d', '6mo', '1y', 'ytd', 'max')
+    en la fecha inicial equivalente. 'max' retorna None (sin límite).
+    """
+    if period == "max":
+        return None
+    today = pd.Timestamp.now().normalize()
+    if period == "ytd":
+        return today.replace(month=1, day=1)
+
+    units = {"mo": "months", "wk": "weeks", "d": "days", "y": "years"}
+    for suffix, unit in units.items():
+        if period.endswith(suffix):
+            return today - pd.DateOffset(**{unit: int(period[: -len(suffix)])})
+    raise ValueError(f"Periodo no soportado: {period}")
+
+
+# -------------------------------------------------------------
+# 2) INTERFAZ DE PROVEEDOR
+# -------------------------------------------------------------
+class MarketDataProvider:
+    """
+    Fuente de barras OHLCV. fetch() recibe varios tickers y retorna
+    { ticker: df } con el formato de download_history (columna 'date' +
+    Open, High, Low, Close, Adj Close, Volume), solo para los tickers con
+    datos. Con 'start' se piden las barras desde esa fecha; si no, 'period'.
+    """
+
+    name = "base"
+
+    def fetch(
+        self,
+        tickers: list[str],
+        interval: str,
+        period: Optional[str] = None,
+        start: Optional[pd.Timestamp] = None,
+    ) -> dict[str, pd.DataFrame]:
+        raise NotImplementedError
+
+
+# yf.download guarda sus resultados y errores en estado global del módulo:
+# dos descargas simultáneas se pisan entre sí
+_yf_download_lock = threading.Lock()
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Yahoo Finance vía yfinance, con una sola petición agrupada por llamada
+    (internamente, una petición HTTP por ticker). Las descargas se hacen de
+    una en una aunque se llame desde varios hilos.
+    """
+
+    name = "yfinance"
+
+    def fetch(self, tickers, interval, period=None, start=None):
+        import yfinance as yf
+
+        range_kwargs = {"start": start} if start is not None else {"period": period}
+        with _yf_download_lock:
+            raw = yf.download(
+                tickers,
+                **range_kwargs,
+                interval=interval,
+                auto_adjust=False,
+                group_by="ticker",
+                threads=True,
+                progress=False,
+            )
+
+        grouped = isinstance(raw.columns, pd.MultiIndex)
+        available = set(raw.columns.get_level_values(0)) if grouped else set()
+
+        data: dict[str, pd.DataFrame] = {}
+        for t in tickers:
+            if grouped:
+                if t not in available:
+                    continue
+                df_t = raw[t]
+            elif len(tickers) == 1:
+                df_t = raw
+            else:
+                continue
+
+            # Filas vacías = días en que el ticker no cotizó o falló su descarga
+            df_t = df_t.dropna(how="all")
+            if df_t.empty:
+                continue
+
+            df_t = normalize_history(df_t)
+            df_t.columns.name = None
+            data[t] = df_t
+        return data
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Precios sintéticos deterministas (movimiento browniano geométrico) para
+    pruebas de carga y perfilado sin red. Cada ticker tiene su propia semilla,
+    drift y volatilidad, y su trayectoria parte de una fecha fija, así que
+    pedir otra ventana (o solo las barras nuevas) da los mismos precios.
+    Solo genera barras diarias de días hábiles.
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        seed: int = SYNTHETIC_SEED,
+        origin: str = SYNTHETIC_ORIGIN,
+        history_days: Optional[int] = SYNTHETIC_HISTORY_DAYS,
+        end: Optional[str] = None,
+    ):
+        self.seed = seed
+        self.origin = pd.Timestamp(origin)
+        self.history_days = history_days
+        self.end = pd.Timestamp(end) if end is not None else None
+
+    def _path(self, ticker: str, n: int) -> dict[str, np.ndarray]:
+        key = zlib.crc32(ticker.encode())
+        params = np.random.default_rng([self.seed, key])
+        mu = params.uniform(-0.05, 0.20)
+        sigma = params.uniform(0.15, 0.60)
+        price0 = params.uniform(20, 500)
+        dt = 1 / 252
+
+        # Un generador por serie: las primeras k barras no dependen de n, así
+        # que alargar la trayectoria (un día más) no cambia las anteriores
+        def stream(i: int) -> np.random.Generator:
+            return np.random.default_rng([self.seed, key, i])
+
+        log_ret = stream(1).normal((mu - 0.5 * sigma ** 2) * dt, sigma * dt ** 0.5, n)
+        close = price0 * np.exp(np.cumsum(log_ret))
+        gap = stream(2).normal(0, 0.25 * sigma * dt ** 0.5, n)
+        open_ = np.concatenate([[close[0]], close[:-1]]) * np.exp(gap)
+        wick_up = np.abs(stream(3).normal(0, 0.5 * sigma * dt ** 0.5, n))
+        wick_down = np.abs(stream(4).normal(0, 0.5 * sigma * dt ** 0.5, n))
+        return {
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + wick_up),
+            "Low": np.minimum(open_, close) * (1 - wick_down),
+            "Close": close,
+            "Adj Close": close,
+            "Volume": np.round(stream(5).lognormal(15, 0.5, n)),
+        }
+
+    def fetch(self, tickers, interval, period=None, start=None):
+        if interval != "1d":
+            raise ValueError(f"SyntheticProvider solo genera barras diarias (pedido: {interval})")
+
+        end = self.end if self.end is not None else pd.Timestamp.now().normalize()
+        dates = pd.bdate_range(self.origin, end)
+        if self.history_days is not None:
+            first = max(0, len(dates) - self.history_days)
+        else:
+            first = 0
+
+        since = start if start is not None else period_start(period or "max")
+        if since is not None:
+            first = max(first, int(dates.searchsorted(pd.Timestamp(since))))
+
+        window = dates[first:]
+        data: dict[str, pd.DataFrame] = {}
+        for t in tickers:
+            path = self._path(t, len(dates))
+            data[t] = pd.DataFrame({
+                "date": window,
+                **{field: values[first:] for field, values in path.items()},
+            })
+        return data
+
+
+def synthetic_universe(n: int) -> list[str]:
+    """
+    Nombres de ticker para un universo sintético de 'n' símbolos.
+    """
+    return [f"SYN{i:05d}" for i in range(n)]
+
+
+# -------------------------------------------------------------
+# 3) PROVEEDOR ACTIVO
+# -------------------------------------------------------------
+PROVIDERS = {
+    YFinanceProvider.name: YFinanceProvider,
+    SyntheticProvider.name: SyntheticProvider,
+}
+
+_provider: Optional[MarketDataProvider] = None
+
+
+def get_provider() -> MarketDataProvider:
+    """
+    Proveedor usado por download_history y download_batch
+    (por defecto el de config.MARKET_DATA_PROVIDER).
+    """
+    global _provider
+    if _provider is None:
+        _provider = PROVIDERS[MARKET_DATA_PROVIDER]()
+    return _provider
+
+
+def set_provider(provider: MarketDataProvider) -> None:
+    """
+    Cambia el proveedor activo (p. ej. SyntheticProvider() para perfilar offline).
+    """
+    global _provider
+    _provider = provider
@@ -0,0 +1,241 @@
+# core/download_scheduler.py
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional
+
+from config import (
+    DEFAULT_PERIOD,
+    DEFAULT_INTERVAL,
+    SCHEDULER_CHUNK_SIZE,
+    SCHEDULER_REQUESTS_PER_SEC,
+    SCHEDULER_BURST,
+    SCHEDULER_MAX_WORKERS,
+    SCHEDULER_MAX_RETRIES,
+    SCHEDULER_PROGRESS_FILE,
+)
+from core.financial_data import update_store
+from core.price_store import PriceStore, get_price_store
+
+
+# -------------------------------------------------------------
+# 1) LIMITADOR DE PETICIONES (TOKEN BUCKET)
+# -------------------------------------------------------------
+class TokenBucket:
+    """
+    Permite 'rate' peticiones por segundo en promedio, con ráfagas de hasta
+    'capacity'. acquire(n) bloquea hasta poder cobrar 'n' tokens; si 'n'
+    supera la capacidad, espera al bucket lleno y queda en deuda, que paga
+    el siguiente en llamar. Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: int = 1) -> None:
+        needed = min(n, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= needed:
+                    self._tokens -= n
+                    return
+                wait = (needed - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# -------------------------------------------------------------
+# 2) UNIVERSO DE TICKERS
+# -------------------------------------------------------------
+def load_universe(path: str) -> list[str]:
+    """
+    Lee una lista de tickers desde un archivo de texto (uno por línea) o un
+    CSV con columna 'Symbol' (p. ej. la lista de componentes del S&P 500).
+    Yahoo usa '-' en lugar de '.' (BRK.B -> BRK-B).
+    """
+    with open(path) as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    if lines and "," in lines[0]:
+        header = [h.strip().lower() for h in lines[0].split(",")]
+        col = header.index("symbol")
+        lines = [line.split(",")[col].strip() for line in lines[1:]]
+
+    tickers = []
+    for t in lines:
+        t = t.upper().replace(".", "-")
+        if t not in tickers:
+            tickers.append(t)
+    return tickers
+
+
+# -------------------------------------------------------------
+# 3) PLANIFICADOR: CHUNKS + RATE LIMIT + CONCURRENCIA + REANUDACIÓN
+# -------------------------------------------------------------
+class DownloadScheduler:
+    """
+    Llena el store local para un universo grande:
+    - divide los tickers en chunks de 'chunk_size' (una petición agrupada cada uno),
+    - respeta un token bucket para no provocar throttling; cada petición
+      agrupada cobra un token por símbolo, porque yfinance hace una petición
+      HTTP por ticker,
+    - descarga como máximo 'max_workers' chunks a la vez,
+    - reintenta los tickers fallidos con espera exponencial,
+    - guarda el progreso en disco: si el proceso se interrumpe, run() continúa
+      con los tickers pendientes del mismo día.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = SCHEDULER_CHUNK_SIZE,
+        rate: float = SCHEDULER_REQUESTS_PER_SEC,
+        burst: int = SCHEDULER_BURST,
+        max_workers: int = SCHEDULER_MAX_WORKERS,
+        max_retries: int = SCHEDULER_MAX_RETRIES,
+        progress_path: Optional[str] = SCHEDULER_PROGRESS_FILE,
+        store: Optional[PriceStore] = None,
+    ):
+        self.chunk_size = chunk_size
+        self.bucket = TokenBucket(rate, burst)
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.progress_path = progress_path
+        self.store = store
+
+    # ---------- progreso en disco ----------
+
+    def _run_id(self, period: str, interval: str) -> str:
+        return f"{dt.date.today().isoformat()}|{period}|{interval}"
+
+    def load_progress(self, period: str, interval: str) -> set[str]:
+        """
+        Tickers ya completados hoy con este period/interval.
+        """
+        if not self.progress_path or not os.path.exists(self.progress_path):
+            return set()
+        with open(self.progress_path) as f:
+            progress = json.load(f)
+        if progress.get("run_id") != self._run_id(period, interval):
+            return set()
+        return set(progress.get("done", []))
+
+    def _save_progress(self, done: set[str], period: str, interval: str) -> None:
+        if not self.progress_path:
+            return
+        os.makedirs(os.path.dirname(self.progress_path) or ".", exist_ok=True)
+        tmp = self.progress_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"run_id": self._run_id(period, interval), "done": sorted(done)}, f)
+        os.replace(tmp, self.progress_path)
+
+    def reset(self) -> None:
+        """
+        Olvida el progreso guardado (la próxima corrida empieza de cero).
+        """
+        if self.progress_path and os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+
+    # ---------- ejecución ----------
+
+    def _run_chunk(self, index: int, chunk: list[str], period: str, interval: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        pending = list(chunk)
+        failed: dict[str, str] = {}
+        rows = 0
+        attempts = 0
+
+        while pending and attempts <= self.max_retries:
+            if attempts:
+                # Espera exponencial antes de reintentar (1s, 2s, 4s, ...)
+                time.sleep(2 ** (attempts - 1))
+            attempts += 1
+            try:
+                result = update_store(
+                    pending,
+                    period=period,
+                    interval=interval,
+                    store=self.store,
+                    throttle=self.bucket.acquire,
+                )
+            except Exception as e:
+                failed = {t: str(e) for t in pending}
+                continue
+
+            rows += result["rows_fetched"]
+            failed = {**result["errors"], **result["stale"]}
+            pending = [t for t in pending if t in failed]
+
+        return {
+            "chunk": index,
+            "tickers": len(chunk),
+            "failed": failed,
+            "rows": rows,
+            "attempts": attempts,
+            "elapsed": time.perf_counter() - start,
+        }
+
+    def run(
+        self,
+        tickers: list[str],
+        period: str = DEFAULT_PERIOD,
+        interval: str = DEFAULT_INTERVAL,
+    ) -> Dict[str, Any]:
+        """
+        Descarga el universo y retorna:
+        { 'done', 'skipped', 'failed', 'rows_fetched', 'chunks', 'elapsed' }
+        donde 'chunks' trae el tiempo, intentos y filas de cada chunk.
+        """
+        if self.store is None:
+            self.store = get_price_store()
+
+        start = time.perf_counter()
+        done = self.load_progress(period, interval)
+        pending = [t for t in tickers if t not in done]
+        chunks = [
+            pending[i:i + self.chunk_size]
+            for i in range(0, len(pending), self.chunk_size)
+        ]
+
+        chunk_reports = []
+        failed: dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [
+                pool.submit(self._run_chunk, i, chunk, period, interval)
+                for i, chunk in enumerate(chunks)
+            ]
+            for future in as_completed(futures):
+                report = future.result()
+                chunk_reports.append(report)
+                failed.update(report["failed"])
+
+                chunk = chunks[report["chunk"]]
+                done.update(t for t in chunk if t not in report["failed"])
+                self._save_progress(done, period, interval)
+
+                print(
+                    f"[SCHED] chunk {report['chunk'] + 1}/{len(chunks)}: "
+                    f"{report['tickers'] - len(report['failed'])}/{report['tickers']} ok, "
+                    f"{report['rows']} filas, {report['attempts']} intento(s), "
+                    f"{report['elapsed']:.2f}s"
+                )
+
+        chunk_reports.sort(key=lambda r: r["chunk"])
+        return {
+            "done": len([t for t in tickers if t in done]),
+            "skipped": len(tickers) - len(pending),
+            "failed": failed,
+            "rows_fetched": sum(r["rows"] for r in chunk_reports),
+            "chunks": chunk_reports,
+            "elapsed": time.perf_counter() - start,
+        }
@@ -1,10 +1,13 @@
 # core/financial_data.py
 
 import datetime as dt
-from typing import Literal, Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Literal, Dict, Any, Optional, Callable
 
+import numpy as np
 import pandas as pd
-import yfinance as yf
 
 from config import (
     SPY_TICKER,
@@ -13,7 +16,13 @@ from config import (
     DEFAULT_INTERVAL,
     VOLATILITY_WINDOW,
     MOMENTUM_WINDOW,
+    USE_PRICE_STORE,
+    DERIVED_CACHE_SIZE,
+    COMPACT_HISTORY,
 )
+from core.data_providers import get_provider, period_start
+from core.price_store import PriceStore, get_price_store
+from core.seasonality import SeasonalityCube
 
 # ---------- FUNCIONES DE DESCARGA ----------
 
@@ -23,28 +32,240 @@ def download_history(
     interval: str = DEFAULT_INTERVAL,
 ) -> pd.DataFrame:
     """
-    Descarga datos históricos de yfinance para un ticker dado.
+    Descarga datos históricos para un ticker dado desde el proveedor activo
+    (yfinance por defecto, ver core/data_providers.py).
     Retorna un DataFrame con columnas típicas: Open, High, Low, Close, Adj Close, Volume.
     """
-    df = yf.download(ticker, period=period, interval=interval, auto_adjust=False)
-    # Aseguramos columna 'Date'
-    df = df.reset_index()
-    df.rename(columns={"Date": "date"}, inplace=True)
+    data = get_provider().fetch([ticker], interval=interval, period=period)
+    df = data.get(ticker, pd.DataFrame())
+    df.attrs["ticker"] = ticker
     return df
 
 
+def download_batch(
+    tickers: list[str],
+    period: str = DEFAULT_PERIOD,
+    interval: str = DEFAULT_INTERVAL,
+    start: Optional[pd.Timestamp] = None,
+) -> Dict[str, Any]:
+    """
+    Descarga todos los tickers en una sola petición agrupada al proveedor
+    activo y la separa en un DataFrame por ticker. Si se indica 'start', se
+    descargan solo las barras desde esa fecha (se ignora 'period').
+
+    Retorna un diccionario con:
+    - 'data': { 'SPY': df_Spy, ... } (solo tickers con datos)
+    - 'errors': { ticker: motivo } para los tickers que fallaron
+    - 'elapsed': segundos de reloj que tomó la descarga
+    """
+    start_time = time.perf_counter()
+
+    try:
+        data_dict = get_provider().fetch(tickers, interval=interval, period=period, start=start)
+    except Exception as e:
+        return {
+            "data": {},
+            "errors": {t: str(e) for t in tickers},
+            "elapsed": time.perf_counter() - start_time,
+        }
+
+    errors: dict[str, str] = {}
+    for t in tickers:
+        if t in data_dict:
+            data_dict[t].attrs["ticker"] = t
+        else:
+            errors[t] = "sin datos en la respuesta"
+
+    return {
+        "data": data_dict,
+        "errors": errors,
+        "elapsed": time.perf_counter() - start_time,
+    }
+
+
+# Diferencia relativa máxima entre una barra ya cerrada guardada y la misma
+# barra descargada de nuevo; por encima, el histórico fue reajustado
+ADJUSTMENT_TOLERANCE = 1e-4
+
+
+def _bar_changed(stored: pd.Series, fetched: pd.DataFrame) -> bool:
+    """
+    True si la barra guardada no coincide con la misma fecha en 'fetched'
+    (Close o Adj Close): un split o dividendo reajustó el histórico.
+    """
+    row = fetched[pd.to_datetime(fetched["date"]) == stored["date"]]
+    if row.empty:
+        return True
+    for field in ("Close", "Adj Close"):
+        if field not in row.columns or pd.isna(stored[field]):
+            continue
+        old, new = float(stored[field]), float(row[field].iloc[0])
+        if not np.isclose(new, old, rtol=ADJUSTMENT_TOLERANCE, atol=0.0):
+            return True
+    return False
+
+
+def update_store(
+    tickers: list[str],
+    period: str = DEFAULT_PERIOD,
+    interval: str = DEFAULT_INTERVAL,
+    store: Optional[PriceStore] = None,
+    throttle: Optional[Callable[[int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Trae al store local las barras que le faltan a cada ticker.
+
+    - Tickers sin datos guardados: descarga completa de 'period'.
+    - Tickers con datos: descarga solo desde la penúltima fecha guardada y
+      agrega lo nuevo (la última barra se reescribe por si estaba
+      incompleta). Los tickers que comparten fecha van en la misma petición.
+    - La penúltima barra ya estaba cerrada: si al descargarla de nuevo no
+      coincide (Yahoo reajusta el histórico tras un split o dividendo), el
+      ticker se borra y se recarga completo, para no mezclar precios
+      ajustados con no ajustados.
+
+    'throttle' (opcional) se llama antes de cada petición de red con el
+    número de símbolos que pide (el proveedor hace una petición por símbolo).
+    Retorna { 'errors': tickers sin histórico, 'stale': tickers cuyo
+    histórico no se pudo actualizar, 'reloaded': tickers recargados por
+    reajuste, 'rows_fetched': filas escritas }.
+    """
+    if store is None:
+        store = get_price_store()
+
+    tails = store.tail(tickers, interval, n=2)
+    cold = [t for t in tickers if t not in tails]
+    warm = [t for t in tickers if t in tails]
+
+    errors: dict[str, str] = {}
+    stale: dict[str, str] = {}
+    reloaded: list[str] = []
+    rows_fetched = 0
+
+    # Una petición agrupada por cada fecha de control distinta: un ticker
+    # atrasado (o deslistado) no obliga a bajar el histórico de todos
+    by_cursor: dict[pd.Timestamp, list[str]] = {}
+    for t in warm:
+        by_cursor.setdefault(tails[t]["date"].iloc[0], []).append(t)
+
+    for cursor, group in sorted(by_cursor.items()):
+        if throttle is not None:
+            throttle(len(group))
+        report = download_batch(group, interval=interval, start=cursor)
+        stale.update(report["errors"])
+        for t, df_t in report["data"].items():
+            # Con una sola barra guardada no hay ninguna cerrada con que comparar
+            if len(tails[t]) > 1 and _bar_changed(tails[t].iloc[0], df_t):
+                store.delete(t, interval)
+                reloaded.append(t)
+                continue
+            last = tails[t]["date"].iloc[-1]
+            df_new = df_t[pd.to_datetime(df_t["date"]) >= last]
+            rows_fetched += store.upsert(t, interval, df_new)
+
+    if reloaded:
+        print(f"Histórico reajustado (split / dividendo), se recarga completo: {', '.join(reloaded)}")
+        cold += reloaded
+
+    if cold:
+        if throttle is not None:
+            throttle(len(cold))
+        report = download_batch(cold, period=period, interval=interval)
+        errors.update(report["errors"])
+        for t, df_t in report["data"].items():
+            rows_fetched += store.upsert(t, interval, df_t)
+
+    return {"errors": errors, "stale": stale, "reloaded": reloaded, "rows_fetched": rows_fetched}
+
+
+def refresh_all_tickers(
+    tickers: list[str] = None,
+    period: str = DEFAULT_PERIOD,
+    interval: str = DEFAULT_INTERVAL,
+    store: Optional[PriceStore] = None,
+    compact: bool = COMPACT_HISTORY,
+) -> Dict[str, Any]:
+    """
+    Actualiza el store local (ver update_store) y lee el histórico desde él.
+
+    Retorna el mismo reporte que download_batch, más 'rows_fetched'
+    (filas nuevas escritas en el store) y 'bytes_before'/'bytes_after'
+    (memoria del histórico antes y después del modo compacto).
+    """
+    if tickers is None:
+        tickers = ALL_TICKERS
+    if store is None:
+        store = get_price_store()
+
+    start_time = time.perf_counter()
+    update = update_store(tickers, period=period, interval=interval, store=store)
+    errors = update["errors"]
+    for t, err in update["stale"].items():
+        print(f"Sin barras nuevas para {t}: {err}")
+
+    since = period_start(period)
+    data_dict: dict[str, pd.DataFrame] = {}
+    for t in tickers:
+        if t in errors:
+            continue
+        df = store.load(t, interval, start=since)
+        if not df.empty:
+            data_dict[t] = df
+
+    bytes_before = bytes_after = history_memory(data_dict)
+    if compact:
+        compacted = compact_all(data_dict)
+        data_dict = compacted["data"]
+        bytes_after = compacted["bytes_after"]
+
+    return {
+        "data": data_dict,
+        "errors": errors,
+        "elapsed": time.perf_counter() - start_time,
+        "rows_fetched": update["rows_fetched"],
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+    }
+
+
 def download_all_tickers(
     tickers: list[str] = None,
     period: str = DEFAULT_PERIOD,
     interval: str = DEFAULT_INTERVAL,
+    batched: bool = True,
+    use_store: bool = USE_PRICE_STORE,
 ) -> dict[str, pd.DataFrame]:
     """
     Descarga datos históricos para una lista de tickers y devuelve un diccionario:
     { 'SPY': df_Spy, 'AAPL': df_Aapl, ... }
+
+    Con use_store=True lee a través del store local (ver refresh_all_tickers).
+    Con batched=True usa una sola petición agrupada (ver download_batch);
+    con batched=False descarga ticker por ticker.
     """
     if tickers is None:
         tickers = ALL_TICKERS
 
+    if use_store:
+        report = refresh_all_tickers(tickers, period=period, interval=interval)
+        for t, err in report["errors"].items():
+            print(f"Error descargando {t}: {err}")
+        print(
+            f"Store actualizado: {report['rows_fetched']} filas nuevas, "
+            f"{len(report['data'])}/{len(tickers)} tickers en {report['elapsed']:.2f}s"
+        )
+        return report["data"]
+
+    if batched:
+        report = download_batch(tickers, period=period, interval=interval)
+        for t, err in report["errors"].items():
+            print(f"Error descargando {t}: {err}")
+        print(
+            f"Descarga agrupada: {len(report['data'])}/{len(tickers)} tickers "
+            f"en {report['elapsed']:.2f}s"
+        )
+        return report["data"]
+
     data_dict: dict[str, pd.DataFrame] = {}
     for t in tickers:
         try:
@@ -56,34 +277,227 @@ def download_all_tickers(
     return data_dict
 
 
+# ---------- MODO COMPACTO ----------
+# Precios en float32 (si el redondeo no mueve ningún precio más de medio
+# centavo; no aplica, p. ej., a BRK-A), volumen en uint32 y sin 'Adj Close'
+# (ningún indicador lo usa). La fecha se mantiene como datetime64, que
+# internamente ya es un int64 epoch.
+
+COMPACT_PRICE_COLUMNS = ("Open", "High", "Low", "Close")
+UNUSED_COLUMNS = ("Adj Close",)
+FLOAT32_ATOL = 0.005
+
+
+def compact_history(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Devuelve una copia de df con tipos compactos.
+    Una columna solo se reduce si sus valores caben sin perder precisión.
+    """
+    out = df.drop(columns=[c for c in UNUSED_COLUMNS if c in df.columns])
+
+    for col in COMPACT_PRICE_COLUMNS:
+        if col not in out.columns:
+            continue
+        values = out[col].to_numpy(dtype=float)
+        as_f32 = values.astype(np.float32)
+        abs_err = np.abs(as_f32 - values)
+        if np.nanmax(abs_err, initial=0.0) <= FLOAT32_ATOL:
+            out[col] = as_f32
+
+    if "Volume" in out.columns:
+        volume = out["Volume"].to_numpy(dtype=float)
+        if np.isfinite(volume).all() and (volume >= 0).all() and (volume < 2 ** 32).all():
+            out["Volume"] = volume.astype(np.uint32)
+
+    return out
+
+
+def history_memory(data: dict[str, pd.DataFrame]) -> int:
+    """
+    Bytes que ocupan los DataFrames de { ticker: df } (incluye el índice).
+    """
+    return int(sum(df.memory_usage(deep=True).sum() for df in data.values()))
+
+
+def compact_all(data: dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """
+    Aplica compact_history a todo el universo y reporta la memoria
+    antes y después: { 'data', 'bytes_before', 'bytes_after' }.
+    """
+    compact = {t: compact_history(df) for t, df in data.items()}
+    return {
+        "data": compact,
+        "bytes_before": history_memory(data),
+        "bytes_after": history_memory(compact),
+    }
+
+
+# ---------- ACCESO A COLUMNAS ----------
+# Los indicadores aceptan tanto un DataFrame de download_history como un
+# ColumnarPrices del cache mmap (core/columnar_cache.py): ambos se leen
+# como arrays NumPy, sin copiar el histórico.
+
+def price_column(df, field: str) -> np.ndarray:
+    """
+    Devuelve la columna 'field' como array NumPy (sin copia si es posible).
+    """
+    values = df[field]
+    if isinstance(values, pd.DataFrame):
+        # Columnas MultiIndex de yfinance: nos quedamos con la única columna
+        values = values.iloc[:, 0]
+    return np.asarray(values)
+
+
+def last_date(df) -> pd.Timestamp:
+    """
+    Fecha de la última barra.
+    """
+    return pd.Timestamp(price_column(df, "date")[-1])
+
+
+def compute_returns(close: np.ndarray) -> np.ndarray:
+    """
+    Rendimientos simples barra a barra. El primero es NaN (igual que pct_change).
+    """
+    close = np.asarray(close, dtype=float)
+    ret = np.full(len(close), np.nan)
+    if len(close) > 1:
+        ret[1:] = close[1:] / close[:-1] - 1.0
+    return ret
+
+
+# ---------- SERIES DERIVADAS (MEMOIZADAS) ----------
+# Rendimientos y partes de la fecha se calculan una vez por versión del
+# histórico (ticker + número de barras + última barra) y se reutilizan en
+# volatilidad, anomalías y estacionalidad. El cache es LRU y acotado.
+
+_derived_cache: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+_derived_lock = threading.Lock()
+derived_cache_stats = {"hits": 0, "misses": 0}
+
+
+def history_key(df) -> tuple:
+    """
+    Identifica una versión del histórico: ticker, número de barras,
+    fecha y cierre de la última barra.
+    """
+    ticker = getattr(df, "ticker", None)
+    if ticker is None and isinstance(df, pd.DataFrame):
+        ticker = df.attrs.get("ticker")
+    if ticker is None:
+        # Sin ticker conocido la clave no sirve para cachear (ver is_cacheable)
+        ticker = f"id:{id(df)}"
+
+    n = len(df)
+    if n == 0:
+        return (ticker, 0, None, None)
+    close = float(price_column(df, "Close")[-1])
+    return (ticker, n, last_date(df), close)
+
+
+def is_cacheable(key: tuple) -> bool:
+    """
+    False si la clave es de un histórico sin ticker: su id() se reutiliza
+    al liberarse y el DataFrame puede editarse en sitio sin cambiar la
+    última barra, así que esos históricos se recalculan siempre.
+    """
+    return not str(key[0]).startswith("id:")
+
+
+def derived_series(df) -> pd.DataFrame:
+    """
+    DataFrame de solo lectura con 'date', 'ret', 'log_ret', 'month',
+    'weekday' y 'day'. No modificar: se comparte entre llamadas (salvo
+    los de históricos sin ticker, que no se cachean).
+    """
+    key = history_key(df)
+    if not is_cacheable(key):
+        return _derive_series(df)
+
+    with _derived_lock:
+        cached = _derived_cache.get(key)
+        if cached is not None:
+            _derived_cache.move_to_end(key)
+            derived_cache_stats["hits"] += 1
+            return cached
+        derived_cache_stats["misses"] += 1
+
+    derived = _derive_series(df)
+    with _derived_lock:
+        _derived_cache[key] = derived
+        while len(_derived_cache) > DERIVED_CACHE_SIZE:
+            _derived_cache.popitem(last=False)
+    return derived
+
+
+def _derive_series(df) -> pd.DataFrame:
+    close = np.asarray(price_column(df, "Close"), dtype=float)
+    dates = pd.DatetimeIndex(pd.to_datetime(price_column(df, "date")))
+    log_close = np.log(close)
+    log_ret = np.full(len(close), np.nan)
+    log_ret[1:] = np.diff(log_close)
+
+    return pd.DataFrame({
+        "date": dates,
+        "ret": compute_returns(close),
+        "log_ret": log_ret,
+        "month": dates.month,
+        "weekday": dates.weekday,
+        "day": dates.day,
+    })
+
+
+def cached_returns(df) -> np.ndarray:
+    """
+    Rendimientos simples memoizados (array de solo lectura).
+    """
+    return derived_series(df)["ret"].to_numpy()
+
+
 # ---------- INDICADORES BÁSICOS ----------
 
+PERIODS_PER_YEAR = {"D": 252, "W": 52, "M": 12}
+
+
 def add_returns(df: pd.DataFrame) -> pd.DataFrame:
     """
     Agrega columna 'ret' con rendimiento diario (Close).
     """
     df = df.copy()
-    df["ret"] = df["Close"].pct_change()
+    df["ret"] = compute_returns(price_column(df, "Close"))
     return df
 
 
+def periods_per_year(df) -> float:
+    """
+    Barras por año según la frecuencia del histórico: 252 para diario,
+    52 para semanal y 12 para mensual (ver core/resampling.py). Los buffers
+    intradía traen el suyo (ver core/intraday_stream.py).
+    """
+    if hasattr(df, "periods_per_year"):
+        return df.periods_per_year
+    freq = df.attrs.get("freq", "D") if isinstance(df, pd.DataFrame) else "D"
+    return PERIODS_PER_YEAR[freq]
+
+
 def compute_volatility(
     df: pd.DataFrame,
     window: int = VOLATILITY_WINDOW,
     annualize: bool = True,
 ) -> float:
     """
-    Calcula volatilidad realizada usando rendimientos diarios y ventana de 'window' días.
-    Por defecto anualiza (multiplica por sqrt(252)).
+    Calcula volatilidad realizada usando rendimientos por barra y ventana de 'window' barras.
+    Por defecto anualiza (multiplica por sqrt(252) en diario, sqrt(52) en semanal
+    y sqrt(12) en mensual).
     """
-    df_ret = add_returns(df)
-    last_window = df_ret["ret"].dropna().tail(window)
-    if len(last_window) == 0:
+    ret = cached_returns(df)
+    last_window = ret[~np.isnan(ret)][-window:]
+    if len(last_window) < 2:
         return float("nan")
 
-    vol = last_window.std()
+    vol = last_window.std(ddof=1)
     if annualize:
-        vol *= (252 ** 0.5)
+        vol *= (periods_per_year(df) ** 0.5)
     return float(vol)
 
 
@@ -91,13 +505,12 @@ def compute_momentum(df: pd.DataFrame, window: int = MOMENTUM_WINDOW) -> float:
     """
     Momentum simple: precio actual / precio de hace 'window' días - 1.
     """
-    df = df.copy()
-    if len(df) < window + 1:
+    close = price_column(df, "Close")
+    if len(close) < window + 1:
         return float("nan")
 
-    # Aseguramos que sean escalares (no Series)
-    p_now = df["Close"].iloc[-1]           # scalar
-    p_past = df["Close"].iloc[-(window+1)] # scalar
+    p_now = close[-1]
+    p_past = close[-(window + 1)]
 
     val = p_now / p_past - 1.0
     return float(val)
@@ -109,54 +522,73 @@ def intraday_high_low(df: pd.DataFrame) -> dict:
     Devuelve info del último día: open, high, low, close.
     Asume que df está ordenado por fecha.
     """
-    if df.empty:
+    if len(df) == 0:
         return {}
 
-    # Aseguramos que sea una fila, no un DataFrame de 1 fila
-    # Si tenías last = df.tail(1), cámbialo por:
-    last = df.iloc[-1]
-
     return {
-        "date": last["date"],
-        "open": float(last["Open"]),
-        "high": float(last["High"]),
-        "low": float(last["Low"]),
-        "close": float(last["Close"]),
+        "date": last_date(df),
+        "open": float(price_column(df, "Open")[-1]),
+        "high": float(price_column(df, "High")[-1]),
+        "low": float(price_column(df, "Low")[-1]),
+        "close": float(price_column(df, "Close")[-1]),
     }
 
 
 
 # ---------- ESTACIONALIDAD ----------
+# Las tres vistas salen del mismo SeasonalityCube (core/seasonality.py),
+# que se guarda por ticker: si el histórico solo trae barras nuevas, el
+# cubo se actualiza en sitio en vez de recorrer de nuevo todos los años.
+
+_cubes: dict[str, SeasonalityCube] = {}
+_cubes_lock = threading.Lock()
+
+
+def _sync_cube(df) -> SeasonalityCube:
+    key = history_key(df)
+    ticker = key[0]
+    dates = price_column(df, "date")
+    closes = price_column(df, "Close")
+    n = len(closes)
+
+    cube = _cubes.get(ticker)
+    if cube is not None and 0 < cube.n_bars <= n:
+        i = cube.n_bars - 1
+        if pd.Timestamp(dates[i]) == cube.last_date:
+            if float(closes[i]) != cube.last_close:
+                # La última barra conocida cambió (p. ej. barra del día en curso)
+                cube.add_bar(dates[i], closes[i])
+            for j in range(cube.n_bars, n):
+                cube.add_bar(dates[j], closes[j])
+            return cube
+
+    cube = SeasonalityCube.from_arrays(dates, closes)
+    if is_cacheable(key):
+        _cubes[ticker] = cube
+    return cube
+
+
+def seasonality_table(df, dim: str) -> pd.DataFrame:
+    """
+    Estacionalidad por 'month', 'weekday' o 'day' desde el cubo del ticker.
+    """
+    with _cubes_lock:
+        return _sync_cube(df).table(dim)
+
 
 def seasonality_by_month(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calcula estacionalidad mensual: rendimiento promedio por mes.
     Retorna un DataFrame con columnas ['month', 'avg_return', 'count'].
     """
-    df_ret = add_returns(df)
-    df_ret["month"] = df_ret["date"].dt.month
-    grouped = (
-        df_ret.groupby("month")["ret"]
-        .agg(avg_return="mean", count="count")
-        .reset_index()
-        .sort_values("month")
-    )
-    return grouped
+    return seasonality_table(df, "month")
 
 
 def seasonality_by_weekday(df: pd.DataFrame) -> pd.DataFrame:
     """
     Estacionalidad semanal: rendimiento promedio por día de la semana (0=Lunes, 4=Viernes).
     """
-    df_ret = add_returns(df)
-    df_ret["weekday"] = df_ret["date"].dt.weekday
-    grouped = (
-        df_ret.groupby("weekday")["ret"]
-        .agg(avg_return="mean", count="count")
-        .reset_index()
-        .sort_values("weekday")
-    )
-    return grouped
+    return seasonality_table(df, "weekday")
 
 
 def seasonality_by_month_day(df: pd.DataFrame) -> pd.DataFrame:
@@ -164,12 +596,4 @@ def seasonality_by_month_day(df: pd.DataFrame) -> pd.DataFrame:
     Estacionalidad por día del mes: rendimiento promedio por 'day of month' (1-31).
     Puede ser ruidoso, pero sirve como ejemplo.
     """
-    df_ret = add_returns(df)
-    df_ret["day"] = df_ret["date"].dt.day
-    grouped = (
-        df_ret.groupby("day")["ret"]
-        .agg(avg_return="mean", count="count")
-        .reset_index()
-        .sort_values("day")
-    )
-    return grouped
+    return seasonality_table(df, "day")
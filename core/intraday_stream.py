@@ -0,0 +1,222 @@
+# core/intraday_stream.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import ALL_TICKERS, INTRADAY_INTERVAL, INTRADAY_BUFFER_SIZE
+from core.financial_data import download_batch, price_column
+from core.streaming_indicators import StreamingIndicators
+
+BAR_FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+# Minutos por barra de cada intervalo intradía de yfinance
+INTERVAL_MINUTES = {"1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30, "60m": 60, "90m": 90, "1h": 60}
+SESSION_MINUTES = 390          # 9:30 – 16:00 NY
+
+
+def bars_per_year(interval: str) -> float:
+    """
+    Barras intradía por año (252 sesiones), para anualizar volatilidades.
+    """
+    return 252 * SESSION_MINUTES / INTERVAL_MINUTES.get(interval, 1)
+
+
+# -------------------------------------------------------------
+# 1) BUFFER CIRCULAR DE BARRAS (MEMORIA FIJA)
+# -------------------------------------------------------------
+class BarRingBuffer:
+    """
+    Últimas 'capacity' barras OHLCV de un ticker en arrays preasignados.
+    Al llenarse, cada barra nueva sobrescribe la más antigua, así que la
+    memoria no crece aunque la sesión dure días. Se indexa como un
+    DataFrame (buffer["Close"]) y los indicadores de financial_data lo
+    aceptan directamente.
+
+    'ticker' lleva el intervalo ('SPY@5m') para que los caches por ticker
+    (rendimientos, estacionalidad) no se mezclen con el histórico diario;
+    el símbolo solo queda en 'symbol'.
+    """
+
+    def __init__(
+        self,
+        ticker: str,
+        capacity: int = INTRADAY_BUFFER_SIZE,
+        interval: str = INTRADAY_INTERVAL,
+    ):
+        self.symbol = ticker
+        self.interval = interval
+        self.ticker = f"{ticker}@{interval}"
+        self.periods_per_year = bars_per_year(interval)
+        self.capacity = capacity
+        self._dates = np.zeros(capacity, dtype="datetime64[ns]")
+        self._values = {f: np.zeros(capacity) for f in BAR_FIELDS}
+        self._pos = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def empty(self) -> bool:
+        return self._size == 0
+
+    @property
+    def last_date(self) -> Optional[pd.Timestamp]:
+        if self._size == 0:
+            return None
+        return pd.Timestamp(self._dates[self._pos - 1])
+
+    def _ordered(self, arr: np.ndarray) -> np.ndarray:
+        if self._size < self.capacity:
+            return arr[:self._size]
+        return np.concatenate([arr[self._pos:], arr[:self._pos]])
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        if field == "date":
+            return self._ordered(self._dates)
+        return self._ordered(self._values[field])
+
+    def append(self, date, bar: dict) -> bool:
+        """
+        Agrega una barra. Si tiene la misma fecha que la última (barra aún
+        abierta), la reemplaza. Retorna True si la barra es nueva.
+        """
+        date = np.datetime64(pd.Timestamp(date), "ns")
+        last = self.last_date
+        if last is not None and date < np.datetime64(last, "ns"):
+            return False
+
+        is_new = last is None or date > np.datetime64(last, "ns")
+        if is_new:
+            idx = self._pos
+            self._pos = (self._pos + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+        else:
+            idx = self._pos - 1
+
+        self._dates[idx] = date
+        for f in BAR_FIELDS:
+            self._values[f][idx] = float(bar.get(f, np.nan))
+        return is_new
+
+
+# -------------------------------------------------------------
+# 2) INGESTA INTRADÍA CON INDICADORES EN VIVO
+# -------------------------------------------------------------
+class IntradayStream:
+    """
+    Mantiene un BarRingBuffer por ticker, actualizado por sondeo (poll) o
+    con barras que llegan de otra fuente (ingest). Por cada barra cerrada
+    actualiza StreamingIndicators en O(1) y lleva el rango de la sesión
+    en curso (open/high/low/close del día).
+    """
+
+    def __init__(
+        self,
+        tickers: list[str] = None,
+        interval: str = INTRADAY_INTERVAL,
+        capacity: int = INTRADAY_BUFFER_SIZE,
+    ):
+        self.tickers = list(tickers or ALL_TICKERS)
+        self.interval = interval
+        self.buffers = {t: BarRingBuffer(t, capacity, interval) for t in self.tickers}
+        self.indicators = {
+            t: StreamingIndicators(periods_per_year=bars_per_year(interval)) for t in self.tickers
+        }
+        self.sessions: dict[str, dict] = {}
+        # Barra abierta por ticker: entra a los indicadores cuando cierra
+        self._open_bar: dict[str, tuple] = {}
+        # Funciones (ticker, fecha, cierre, llegada) avisadas por cada barra cerrada
+        self.listeners: list = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback) -> None:
+        """
+        Registra callback(ticker, date, close, arrived) para cada barra que
+        cierra; 'arrived' es el time.perf_counter() de llegada de los datos.
+        """
+        self.listeners.append(callback)
+
+    def _update_session(self, ticker: str, date: pd.Timestamp, bar: dict) -> None:
+        session = self.sessions.get(ticker)
+        if session is None or session["date"] != date.date():
+            self.sessions[ticker] = {
+                "date": date.date(),
+                "open": float(bar["Open"]),
+                "high": float(bar["High"]),
+                "low": float(bar["Low"]),
+                "close": float(bar["Close"]),
+            }
+            return
+        # La barra abierta solo puede ampliar el rango, no reducirlo
+        session["high"] = max(session["high"], float(bar["High"]))
+        session["low"] = min(session["low"], float(bar["Low"]))
+        session["close"] = float(bar["Close"])
+
+    def ingest(self, ticker: str, df: pd.DataFrame) -> int:
+        """
+        Agrega las barras de df (formato download_history) que sean más
+        recientes que el buffer. Retorna cuántas barras nuevas entraron.
+        """
+        arrived = time.perf_counter()
+        dates = pd.to_datetime(pd.Series(price_column(df, "date")))
+        if dates.dt.tz is not None:
+            # Hora local del mercado, sin zona, para que la fecha sea la de la sesión
+            dates = dates.dt.tz_localize(None)
+
+        columns = {f: price_column(df, f) for f in BAR_FIELDS if f in df.columns}
+        buffer = self.buffers[ticker]
+        new_bars = 0
+        closed = []
+        with self._lock:
+            for i, date in enumerate(dates):
+                bar = {f: values[i] for f, values in columns.items()}
+                if buffer.last_date is not None and date < buffer.last_date:
+                    continue
+
+                if buffer.append(date, bar):
+                    new_bars += 1
+                    previous = self._open_bar.get(ticker)
+                    if previous is not None:
+                        self.indicators[ticker].update(previous[1])
+                        closed.append(previous)
+                self._open_bar[ticker] = (date, float(bar["Close"]))
+                self._update_session(ticker, date, bar)
+
+        for date, close in closed:
+            for listener in self.listeners:
+                listener(ticker, date, close, arrived)
+        return new_bars
+
+    def poll(self) -> dict[str, int]:
+        """
+        Descarga las barras del día para todos los tickers en una petición
+        agrupada y las ingiere. Retorna { ticker: barras nuevas }.
+        """
+        report = download_batch(self.tickers, period="1d", interval=self.interval)
+        for t, err in report["errors"].items():
+            print(f"[INTRADAY] Sin barras para {t}: {err}")
+        return {t: self.ingest(t, df) for t, df in report["data"].items()}
+
+    def snapshot(self, ticker: str) -> Dict[str, Any]:
+        """
+        Indicadores en vivo (sobre barras cerradas) y rango de la sesión.
+        La volatilidad se anualiza con el número de barras por año del intervalo.
+        """
+        with self._lock:
+            state = self.indicators[ticker]
+            return {
+                "ticker": ticker,
+                "interval": self.interval,
+                "bars": len(self.buffers[ticker]),
+                "last_bar": self.buffers[ticker].last_date,
+                "volatility": state.volatility(),
+                "momentum": state.momentum(),
+                "anomaly_info": state.anomaly(),
+                "session": dict(self.sessions.get(ticker, {})),
+            }
@@ -0,0 +1,227 @@
+# core/news_archive.py
+from __future__ import annotations
+
+import datetime as dt
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional
+
+from config import (
+    NEWS_ARCHIVE_PATH,
+    NEWS_ARCHIVE_START_DAYS,
+    NEWS_ARCHIVE_MAX_PAGES,
+)
+from core.news_fetcher import fetch_news_since
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    link TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    publisher TEXT,
+    published TEXT
+);
+CREATE TABLE IF NOT EXISTS article_tickers (
+    ticker TEXT NOT NULL,
+    article_id INTEGER NOT NULL REFERENCES articles(id),
+    PRIMARY KEY (ticker, article_id)
+);
+CREATE TABLE IF NOT EXISTS backfill_cursors (
+    ticker TEXT PRIMARY KEY,
+    cursor TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, publisher, content='articles', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, publisher) VALUES (new.id, new.title, new.publisher);
+END;
+"""
+
+
+def fts_query(text: str) -> Optional[str]:
+    """
+    Convierte texto libre en una consulta FTS5 segura: cada palabra de 3+
+    letras entre comillas, unidas con OR. None si no queda ninguna.
+    """
+    words = {w.lower() for w in re.findall(r"\w{3,}", text or "")}
+    if not words:
+        return None
+    return " OR ".join(f'"{w}"' for w in sorted(words))
+
+
+# -------------------------------------------------------------
+# ARCHIVO LOCAL DE NOTICIAS (SQLite + FTS5)
+# -------------------------------------------------------------
+class NewsArchive:
+    """
+    Titulares guardados en SQLite con índice de texto completo (FTS5).
+    Cada artículo se guarda una vez (por URL) y se asocia a sus tickers.
+    backfill() trae solo lo publicado después del cursor de cada ticker,
+    así que se puede llamar seguido sin repetir descargas. El cursor es
+    propio del backfill: los artículos sueltos guardados con add() (p. ej.
+    los 5 más recientes de una consulta) no lo mueven ni dejan huecos.
+    """
+
+    def __init__(self, path: str = NEWS_ARCHIVE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def add(self, ticker: str, articles: List[Dict[str, Any]]) -> int:
+        """
+        Guarda artículos de un ticker. Retorna cuántos eran nuevos.
+        """
+        new = 0
+        with self._lock, self._conn:
+            for art in articles:
+                link = art.get("link")
+                if not link:
+                    continue
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO articles (link, title, publisher, published) VALUES (?, ?, ?, ?)",
+                    (link, art.get("title") or "", art.get("publisher"), art.get("published")),
+                )
+                new += cur.rowcount
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO article_tickers (ticker, article_id) "
+                    "SELECT ?, id FROM articles WHERE link = ?",
+                    (ticker, link),
+                )
+        return new
+
+    def backfill_cursor(self, ticker: str) -> Optional[str]:
+        """
+        Fecha de publicación hasta la que el backfill del ticker está completo.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cursor FROM backfill_cursors WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _advance_cursors(self, tickers: List[str], cursor: str) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO backfill_cursors (ticker, cursor) VALUES (?, ?) "
+                "ON CONFLICT(ticker) DO UPDATE SET cursor = MAX(cursor, excluded.cursor)",
+                [(t, cursor) for t in tickers],
+            )
+
+    def backfill(self, tickers: List[str], max_pages: int = NEWS_ARCHIVE_MAX_PAGES) -> Dict[str, int]:
+        """
+        Descarga lo publicado después del cursor de cada ticker (o de los
+        últimos NEWS_ARCHIVE_START_DAYS días si aún no tiene cursor).
+        Los tickers con cursor se piden juntos desde el más antiguo (lo
+        repetido se ignora al guardar) y los nuevos, juntos desde el inicio.
+        Las páginas llegan de la más antigua a la más reciente, así que si
+        max_pages corta la descarga, el cursor queda en la última noticia
+        recibida y la siguiente llamada sigue desde ahí sin dejar huecos.
+        Retorna { ticker: nuevos }.
+        """
+        start = (dt.datetime.utcnow() - dt.timedelta(days=NEWS_ARCHIVE_START_DAYS)).strftime("%Y-%m-%d")
+        cursors = {t: self.backfill_cursor(t) for t in tickers}
+        warm = [t for t in tickers if cursors[t]]
+        cold = [t for t in tickers if not cursors[t]]
+
+        groups: Dict[str, List[str]] = {}
+        if warm:
+            # MarketAux acepta 'YYYY-MM-DDTHH:MM:SS' (sin fracción ni zona)
+            groups[min(cursors[t] for t in warm)[:19]] = warm
+        if cold:
+            groups.setdefault(start, []).extend(cold)
+
+        added = {t: 0 for t in tickers}
+        for since, group in groups.items():
+            news = fetch_news_since(group, since, max_pages=max_pages)
+            if news is None:
+                continue
+            for t, articles in news.items():
+                added[t] += self.add(t, articles)
+            # La consulta cubre a todo el grupo: hasta la última noticia recibida
+            # (de cualquiera de sus tickers) no falta nada para ninguno
+            received = [a["published"] for articles in news.values() for a in articles if a["published"]]
+            if received:
+                self._advance_cursors(group, max(received))
+
+        print(f"[NEWS] Archivo: {sum(added.values())} noticias nuevas en {len(groups)} peticiones agrupadas")
+        return added
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        ticker: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca en el archivo por palabras (texto libre, sin sintaxis FTS),
+        ticker y rango de fechas ('YYYY-MM-DD'). Con palabras, ordena por
+        relevancia (bm25); sin ellas, de la más reciente a la más antigua.
+        """
+        match = fts_query(query) if query else None
+        if query and match is None:
+            return []
+
+        sql = "SELECT a.id, a.link, a.title, a.publisher, a.published FROM articles a"
+        where, params = [], []
+        if match is not None:
+            sql += " JOIN articles_fts f ON f.rowid = a.id"
+            where.append("articles_fts MATCH ?")
+            params.append(match)
+        if ticker is not None:
+            sql += " JOIN article_tickers t ON t.article_id = a.id"
+            where.append("t.ticker = ?")
+            params.append(ticker)
+        if start is not None:
+            where.append("a.published >= ?")
+            params.append(start)
+        if end is not None:
+            # Fin inclusive: cualquier hora de ese día
+            where.append("a.published < ?")
+            params.append(f"{end}~")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + ("bm25(articles_fts), " if match is not None else "") + "a.published DESC"
+        sql += " LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "title": r["title"],
+                "publisher": r["publisher"],
+                "link": r["link"],
+                "published": r["published"],
+            }
+            for r in rows
+        ]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+
+_archive: Optional[NewsArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_news_archive() -> NewsArchive:
+    """
+    Archivo compartido en NEWS_ARCHIVE_PATH.
+    """
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = NewsArchive()
+        return _archive
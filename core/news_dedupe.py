@@ -0,0 +1,142 @@
+# core/news_dedupe.py
+from __future__ import annotations
+
+import re
+import unicodedata
+import zlib
+from typing import List, Dict, Any
+
+import numpy as np
+
+from config import (
+    NEWS_DUP_THRESHOLD,
+    NEWS_SHINGLE_SIZE,
+    NEWS_MINHASH_PERMS,
+    NEWS_MINHASH_BANDS,
+)
+
+_rng = np.random.default_rng(20240601)
+# Coeficientes fijos: la misma frase da la misma firma en cualquier proceso.
+# Multiplicadores impares de 64 bits (la multiplicación módulo 2^64 mezcla bien)
+_HASH_A = _rng.integers(0, 1 << 63, NEWS_MINHASH_PERMS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_HASH_B = _rng.integers(0, 1 << 63, NEWS_MINHASH_PERMS, dtype=np.uint64)
+_EMPTY = np.iinfo(np.uint64).max
+
+
+# -------------------------------------------------------------
+# 1) SHINGLES Y FIRMAS MINHASH
+# -------------------------------------------------------------
+def normalize_title(title: str) -> str:
+    """
+    Minúsculas, sin acentos ni puntuación y con espacios simples.
+    """
+    text = unicodedata.normalize("NFKD", title or "").encode("ascii", "ignore").decode()
+    text = re.sub(r"[^a-z0-9]+", " ", text.lower())
+    return text.strip()
+
+
+def shingles(title: str, k: int = NEWS_SHINGLE_SIZE) -> np.ndarray:
+    """
+    Hashes (crc32) de los k-gramas de caracteres del titular normalizado.
+    """
+    text = normalize_title(title)
+    if len(text) <= k:
+        grams = {text}
+    else:
+        grams = {text[i:i + k] for i in range(len(text) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64)
+
+
+def minhash(hashes: np.ndarray) -> np.ndarray:
+    """
+    Firma MinHash: para cada función h(x) = mezcla(a·x + b mod 2^64), el
+    mínimo sobre los shingles.
+    """
+    if len(hashes) == 0:
+        return np.full(NEWS_MINHASH_PERMS, _EMPTY, dtype=np.uint64)
+    # uint64 desborda módulo 2^64 a propósito; el xorshift lleva los bits altos a los bajos
+    values = _HASH_A[:, None] * hashes[None, :] + _HASH_B[:, None]
+    values ^= values >> np.uint64(29)
+    values *= np.uint64(0xBF58476D1CE4E5B9)
+    values ^= values >> np.uint64(32)
+    return values.min(axis=1)
+
+
+# -------------------------------------------------------------
+# 2) AGRUPACIÓN DE CASI-DUPLICADOS
+# -------------------------------------------------------------
+def near_duplicate_clusters(
+    titles: List[str],
+    threshold: float = NEWS_DUP_THRESHOLD,
+) -> List[List[int]]:
+    """
+    Agrupa los índices de titulares casi iguales. Los candidatos salen de
+    LSH por bandas (firmas que coinciden en alguna banda) y se confirman si
+    la similitud estimada (fracción de posiciones iguales) es >= threshold.
+    Cada grupo conserva el orden original.
+    """
+    n = len(titles)
+    if n == 0:
+        return []
+    signatures = np.vstack([minhash(shingles(t)) for t in titles])
+    rows = NEWS_MINHASH_PERMS // NEWS_MINHASH_BANDS
+
+    parent = list(range(n))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked = set()
+    for b in range(NEWS_MINHASH_BANDS):
+        buckets: Dict[bytes, List[int]] = {}
+        for i in range(n):
+            key = signatures[i, b * rows:(b + 1) * rows].tobytes()
+            buckets.setdefault(key, []).append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    i, j = members[x], members[y]
+                    if (i, j) in checked:
+                        continue
+                    checked.add((i, j))
+                    if np.mean(signatures[i] == signatures[j]) >= threshold:
+                        parent[find(j)] = find(i)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(n):
+        clusters.setdefault(find(i), []).append(i)
+    return sorted(clusters.values(), key=lambda c: c[0])
+
+
+def collapse_near_duplicates(
+    articles: List[Dict[str, Any]],
+    threshold: float = NEWS_DUP_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """
+    Deja un artículo por grupo de titulares casi iguales (el primero de la
+    lista, normalmente el más reciente) con 'sources' (cuántos artículos
+    representa) y 'publishers' (fuentes distintas del grupo).
+    """
+    clusters = near_duplicate_clusters([a.get("title") or "" for a in articles], threshold)
+    collapsed = []
+    for members in clusters:
+        representative = dict(articles[members[0]])
+        publishers = []
+        for i in members:
+            publisher = articles[i].get("publisher")
+            if publisher and publisher not in publishers:
+                publishers.append(publisher)
+        representative["sources"] = len(members)
+        representative["publishers"] = publishers
+        collapsed.append(representative)
+    return collapsed
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimación local de tokens (~4 caracteres por token en inglés), sin tokenizer.
+    """
+    return (len(text) + 3) // 4
@@ -2,10 +2,29 @@
 from __future__ import annotations
 
 import os
+import json
+import asyncio
+import time
+import threading
 import datetime as dt
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, AsyncIterator
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    NEWS_TIMEOUT,
+    NEWS_LOOKBACK_DAYS,
+    NEWS_PAGE_LIMIT,
+    NEWS_BULK_ROUNDS,
+    NEWS_POOL_SIZE,
+    NEWS_CACHE_TTL,
+    NEWS_CACHE_FILE,
+    NEWS_ASYNC_CONCURRENCY,
+    NEWS_DEADLINE,
+)
+from core.news_dedupe import collapse_near_duplicates, estimate_tokens
 
 # Puedes poner la API key aquí o usar variable de entorno MARKET_AUX_API_KEY
 API_KEY = os.getenv("MARKET_AUX_API_KEY") or "MOO3hXWObTTUZHhGt9yqcMvEBSrtRL3Wj000l25e"
@@ -13,53 +32,444 @@ API_KEY = os.getenv("MARKET_AUX_API_KEY") or "MOO3hXWObTTUZHhGt9yqcMvEBSrtRL3Wj0
 
 BASE_URL = "https://api.marketaux.com/v1/news/all"
 
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
 
-def fetch_news_for_ticker(ticker: str, limit: int = 5) -> List[Dict[str, Any]]:
-    if not API_KEY or API_KEY == "TU_API_KEY_AQUI":
-        print("[NEWS] ERROR: No API key configurada para MarketAux.")
-        return []
 
-    # ✅ Formato correcto: YYYY-MM-DD
-    published_after = (dt.datetime.utcnow() - dt.timedelta(days=3)).strftime("%Y-%m-%d")
+def get_session() -> requests.Session:
+    """
+    Session HTTP compartida (keep-alive): las peticiones reutilizan la
+    conexión TCP/TLS en lugar de abrir una nueva cada vez.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=NEWS_POOL_SIZE, pool_maxsize=NEWS_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.headers["Authorization"] = f"Bearer {API_KEY}"
+            _session = session
+        return _session
 
+
+def _parse_article(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": item.get("title") or "Sin título",
+        "publisher": item.get("source") or "Fuente desconocida",
+        "link": item.get("url") or "",
+        "published": item.get("published_at") or "",
+    }
+
+
+def _request_news(
+    symbols: List[str],
+    published_after: str,
+    limit: int,
+    timeout: float = NEWS_TIMEOUT,
+    page: int = 1,
+    ascending: bool = False,
+) -> Optional[tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """
+    Una petición a MarketAux para varios símbolos. Por defecto de la más
+    reciente a la más antigua; con ascending, al revés. Retorna (items
+    crudos, meta) o None si la petición falló.
+    """
     params = {
-        "symbols": ticker,
+        "symbols": ",".join(symbols),
         "language": "en",
         "filter_entities": "true",
         "published_after": published_after,
         "limit": limit,
     }
-
-    headers = {
-        "Authorization": f"Bearer {API_KEY}"
-    }
+    if page > 1:
+        params["page"] = page
+    if ascending:
+        params["sort"] = "published_on"
+        params["sort_order"] = "asc"
 
     try:
-        resp = requests.get(BASE_URL, params=params, headers=headers, timeout=10)
+        resp = get_session().get(BASE_URL, params=params, timeout=timeout)
     except Exception as e:
         print(f"[NEWS] ERROR de conexión: {e}")
-        return []
+        return None
 
     print("[NEWS] status_code:", resp.status_code)
 
     if resp.status_code != 200:
         print("[NEWS] Response text:", resp.text[:400])
-        return []
+        return None
+
+    body = resp.json()
+    return body.get("data", []), body.get("meta") or {}
+
+
+def _has_more(items: List[Dict[str, Any]], meta: Dict[str, Any], requested: int) -> bool:
+    """
+    True si la consulta tiene más resultados que los entregados hasta esta
+    página. Se decide con meta ('found', 'returned', 'limit', 'page') porque
+    el plan puede recortar la página por debajo de lo pedido; sin meta, una
+    página llena indica que puede haber más.
+    """
+    if "found" not in meta:
+        return len(items) >= requested
+    per_page = meta.get("limit") or requested
+    delivered = (meta.get("page", 1) - 1) * per_page + meta.get("returned", len(items))
+    return meta["found"] > delivered
+
+
+# ---------- CACHE DE NOTICIAS (TTL + DISCO) ----------
+
+# (ticker, días) -> {"fetched_at", "limit", "articles"}; compartido por todas las sesiones
+_news_cache: Dict[str, Dict[str, Any]] = {}
+_news_cache_lock = threading.Lock()
+_news_cache_loaded = False
+news_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _cache_key(ticker: str, days: int) -> str:
+    return f"{ticker}|{days}"
+
+
+def _load_news_cache() -> None:
+    global _news_cache_loaded
+    if _news_cache_loaded:
+        return
+    _news_cache_loaded = True
+    try:
+        with open(NEWS_CACHE_FILE, encoding="utf-8") as f:
+            _news_cache.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[NEWS] Cache en disco ilegible, se ignora: {e}")
+
+
+def _save_news_cache() -> None:
+    # Escritura atómica: otro proceso nunca lee un JSON a medias
+    os.makedirs(os.path.dirname(NEWS_CACHE_FILE), exist_ok=True)
+    tmp = f"{NEWS_CACHE_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_news_cache, f)
+    os.replace(tmp, NEWS_CACHE_FILE)
+
+
+def dedupe_by_url(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Quita artículos repetidos (misma URL), conservando el primero.
+    """
+    seen = set()
+    unique = []
+    for art in articles:
+        key = art.get("link") or art.get("title")
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(art)
+    return unique
+
+
+def cached_news(ticker: str, limit: int, days: int = NEWS_LOOKBACK_DAYS) -> Optional[List[Dict[str, Any]]]:
+    """
+    Artículos en cache si la consulta (ticker, días) tiene menos de
+    NEWS_CACHE_TTL segundos y se pidió con al menos 'limit' artículos.
+    Retorna None si no hay entrada válida.
+    """
+    with _news_cache_lock:
+        _load_news_cache()
+        entry = _news_cache.get(_cache_key(ticker, days))
+        fresh = (
+            entry is not None
+            and time.time() - entry["fetched_at"] < NEWS_CACHE_TTL
+            and entry["limit"] >= limit
+        )
+        news_cache_stats["hits" if fresh else "misses"] += 1
+        return entry["articles"][:limit] if fresh else None
+
+
+def store_news(news: Dict[str, List[Dict[str, Any]]], limit: int, days: int = NEWS_LOOKBACK_DAYS) -> None:
+    """
+    Guarda { ticker: artículos } en el cache (memoria + disco).
+    """
+    if not news:
+        return
+    now = time.time()
+    with _news_cache_lock:
+        _load_news_cache()
+        for ticker, articles in news.items():
+            _news_cache[_cache_key(ticker, days)] = {
+                "fetched_at": now,
+                "limit": limit,
+                "articles": dedupe_by_url(articles),
+            }
+        # Las entradas vencidas no se vuelven a usar: no vale la pena persistirlas
+        for key in [k for k, v in _news_cache.items() if now - v["fetched_at"] >= NEWS_CACHE_TTL]:
+            del _news_cache[key]
+        try:
+            _save_news_cache()
+        except Exception as e:
+            print(f"[NEWS] No se pudo guardar el cache en disco: {e}")
+
+
+def news_cache_info() -> Dict[str, Any]:
+    """
+    Aciertos, fallos, tasa de acierto y entradas del cache de noticias.
+    """
+    hits, misses = news_cache_stats["hits"], news_cache_stats["misses"]
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / (hits + misses) if hits + misses else float("nan"),
+        "entries": len(_news_cache),
+    }
+
+
+def _fetch_news_uncached(
+    tickers: List[str],
+    limit: int,
+    days: int,
+    timeout: float = NEWS_TIMEOUT,
+) -> tuple[Dict[str, List[Dict[str, Any]]], bool, set]:
+    """
+    Descarga de fetch_news_bulk sin cache. Retorna (noticias, ok, completos):
+    ok es False si la primera petición falló (el resultado vacío no es real)
+    y 'completos' son los tickers con 'limit' artículos o sin más resultados
+    en MarketAux; los demás quedaron cortos al agotarse las rondas y no
+    deben guardarse en cache.
+    """
+    result: Dict[str, List[Dict[str, Any]]] = {t: [] for t in tickers}
+    if not API_KEY or API_KEY == "TU_API_KEY_AQUI":
+        print("[NEWS] ERROR: No API key configurada para MarketAux.")
+        return result, False, set()
+
+    # ✅ Formato correcto: YYYY-MM-DD
+    published_after = (dt.datetime.utcnow() - dt.timedelta(days=days)).strftime("%Y-%m-%d")
+
+    seen: Dict[str, set] = {t: set() for t in tickers}
+    pending = list(tickers)
+    requests_made = 0
+    page = 1
+    ok = False
+    exhausted = False
+    while pending and requests_made < NEWS_BULK_ROUNDS:
+        # Un solo ticker: basta con 'limit'; varios: la página más grande del plan
+        page_limit = limit if len(pending) == 1 else max(limit, NEWS_PAGE_LIMIT)
+        response = _request_news(pending, published_after, page_limit, timeout, page=page)
+        requests_made += 1
+        if response is None:
+            break
+        items, meta = response
+        ok = True
+
+        for item in items:
+            symbols = {e.get("symbol") for e in item.get("entities") or []}
+            if not symbols and len(pending) == 1:
+                symbols = {pending[0]}
+            article = _parse_article(item)
+            key = item.get("uuid") or article["link"]
+            for t in pending:
+                if t in symbols and key not in seen[t]:
+                    seen[t].add(key)
+                    result[t].append(article)
+
+        # Una ronda más solo si quedan resultados sin entregar y algún ticker quedó corto:
+        # con los mismos tickers, la página siguiente; con menos, una consulta nueva
+        short = [t for t in pending if len(result[t]) < limit]
+        if not _has_more(items, meta, page_limit):
+            exhausted = True
+            break
+        if not short:
+            break
+        page = page + 1 if len(short) == len(pending) else 1
+        pending = short
+
+    for t in tickers:
+        articles = sorted(result[t], key=lambda a: a["published"], reverse=True)
+        result[t] = dedupe_by_url(articles)[:limit]
+
+    # Sin más resultados para la última consulta, lo que tienen sus tickers es todo
+    complete = {t for t in tickers if len(result[t]) >= limit}
+    if ok and exhausted:
+        complete.update(pending)
+
+    total = sum(len(v) for v in result.values())
+    print(f"[NEWS] Encontradas {total} noticias para {len(tickers)} tickers en {requests_made} peticiones")
+    if ok and len(complete) < len(tickers):
+        print(f"[NEWS] Sin cache (incompletos): {', '.join(t for t in tickers if t not in complete)}")
+    return result, ok, complete
+
+
+def fetch_news_bulk(
+    tickers: List[str],
+    limit: int = 5,
+    days: int = NEWS_LOOKBACK_DAYS,
+    use_cache: bool = True,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Noticias recientes de varios tickers con el mínimo de peticiones: se
+    piden todos los símbolos juntos y cada artículo se asigna a los tickers
+    que aparecen en sus 'entities'. Si algún ticker quedó con menos de
+    'limit' artículos, la siguiente ronda pide solo esos (hasta
+    NEWS_BULK_ROUNDS peticiones). Retorna { ticker: [artículos] }, del más
+    reciente al más antiguo.
+    Con use_cache, los tickers con una consulta fresca en el cache no se
+    vuelven a pedir.
+    """
+    if not use_cache:
+        return _fetch_news_uncached(tickers, limit, days)[0]
+
+    cached = {t: cached_news(t, limit, days) for t in tickers}
+    missing = [t for t, articles in cached.items() if articles is None]
+    if not missing:
+        return cached
+
+    fetched, _, complete = _fetch_news_uncached(missing, limit, days)
+    store_news({t: fetched[t] for t in complete}, limit, days)
+    return {t: cached[t] if cached[t] is not None else fetched[t] for t in tickers}
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _news_executor() -> ThreadPoolExecutor:
+    """
+    Hilos de fetch_news_async, propios y no el executor por defecto del
+    loop: asyncio.run espera a que este último termine, así que una petición
+    colgada bloquearía a quien llama aunque ya pasara su 'deadline'.
+    Un hilo por conexión del Session compartido.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=NEWS_POOL_SIZE, thread_name_prefix="news")
+        return _executor
 
-    data = resp.json()
-    items = data.get("data", [])
-    print(f"[NEWS] Encontradas {len(items)} noticias para {ticker}")
 
-    articles: List[Dict[str, Any]] = []
-    for item in items:
-        articles.append({
-            "title": item.get("title") or "Sin título",
-            "publisher": item.get("source") or "Fuente desconocida",
-            "link": item.get("url") or "",
-            "published": item.get("published_at") or "",
-        })
+async def fetch_news_async(
+    tickers: List[str],
+    limit: int = 5,
+    days: int = NEWS_LOOKBACK_DAYS,
+    priority: Optional[str] = None,
+    group_size: Optional[int] = 1,
+    concurrency: int = NEWS_ASYNC_CONCURRENCY,
+    deadline: float = NEWS_DEADLINE,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Versión asyncio de fetch_news_bulk que entrega los resultados a medida
+    que llegan, para pintar resultados parciales sin esperar al más lento.
+    Genera un dict por ticker: ticker, articles, cached, error, elapsed.
+
+    - Los tickers con cache fresco se entregan de inmediato.
+    - El resto se pide en grupos de 'group_size' símbolos (None = todos en
+      una petición); 'priority' va solo en su propio grupo para llegar antes.
+    - Como mucho 'concurrency' peticiones en vuelo (contando las que ya
+      pasaron su plazo y siguen en su hilo); cada una con 'deadline'
+      segundos antes de darse por perdida.
+    - Las peticiones corren en el pool de _news_executor: al vencer los
+      plazos el generador termina (y asyncio.run retorna) sin esperar a los
+      hilos atrasados, que acaban por su cuenta con su propio timeout.
+    """
+    start_time = time.perf_counter()
+    missing = []
+    for t in tickers:
+        articles = cached_news(t, limit, days)
+        if articles is None:
+            missing.append(t)
+        else:
+            yield {"ticker": t, "articles": articles, "cached": True, "error": None, "elapsed": 0.0}
+
+    groups = []
+    if priority in missing:
+        groups.append([priority])
+        missing = [t for t in missing if t != priority]
+    size = group_size or len(missing) or 1
+    groups += [missing[i:i + size] for i in range(0, len(missing), size)]
 
-    return articles
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    workers: set = set()
+
+    async def fetch_group(group: List[str]) -> tuple[List[str], Dict[str, list], Optional[str]]:
+        await semaphore.acquire()
+        worker = loop.run_in_executor(_news_executor(), _fetch_news_uncached, group, limit, days, deadline)
+        workers.add(worker)
+        # El hilo no se puede cancelar: el cupo se libera cuando termina de
+        # verdad, no al vencer el plazo, para no pasar de 'concurrency'
+        # peticiones HTTP en vuelo
+        worker.add_done_callback(lambda _: semaphore.release())
+        done, _ = await asyncio.wait({worker}, timeout=deadline)
+        if not done:
+            return group, {}, f"sin respuesta en {deadline}s"
+        try:
+            news, ok, complete = worker.result()
+        except Exception as e:
+            return group, {}, str(e)
+        if not ok:
+            return group, news, "la petición falló"
+        store_news({t: news[t] for t in complete}, limit, days)
+        return group, news, None
+
+    try:
+        for next_done in asyncio.as_completed([fetch_group(g) for g in groups]):
+            group, news, error = await next_done
+            elapsed = time.perf_counter() - start_time
+            for t in group:
+                yield {
+                    "ticker": t,
+                    "articles": news.get(t, []),
+                    "cached": False,
+                    "error": error,
+                    "elapsed": elapsed,
+                }
+    finally:
+        # Desliga los hilos atrasados de este loop (que puede cerrarse antes
+        # de que terminen); siguen ocupando su hilo del pool hasta acabar
+        for worker in workers:
+            if not worker.done():
+                worker.cancel()
+
+
+def fetch_news_since(
+    tickers: List[str],
+    published_after: str,
+    max_pages: int = 1,
+) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """
+    Noticias de los tickers publicadas después de 'published_after'
+    ('YYYY-MM-DD' o 'YYYY-MM-DDTHH:MM:SS'), de la más antigua a la más
+    reciente, paginando hasta 'max_pages' páginas agrupadas. Si se corta
+    por max_pages, lo que falta es lo más nuevo: todo lo anterior a la
+    última noticia recibida ya está completo. Sin cache (para alimentar el
+    archivo local). Retorna { ticker: [artículos] } o None si la primera
+    petición falló.
+    """
+    if not API_KEY or API_KEY == "TU_API_KEY_AQUI":
+        print("[NEWS] ERROR: No API key configurada para MarketAux.")
+        return None
+
+    result: Dict[str, List[Dict[str, Any]]] = {t: [] for t in tickers}
+    for page in range(1, max_pages + 1):
+        response = _request_news(tickers, published_after, NEWS_PAGE_LIMIT, page=page, ascending=True)
+        if response is None:
+            return result if page > 1 else None
+        items, meta = response
+
+        for item in items:
+            symbols = {e.get("symbol") for e in item.get("entities") or []}
+            if not symbols and len(tickers) == 1:
+                symbols = {tickers[0]}
+            article = _parse_article(item)
+            for t in tickers:
+                if t in symbols:
+                    result[t].append(article)
+
+        if not _has_more(items, meta, NEWS_PAGE_LIMIT):
+            break
+    return result
+
+
+def fetch_news_for_ticker(ticker: str, limit: int = 5) -> List[Dict[str, Any]]:
+    return fetch_news_bulk([ticker], limit=limit)[ticker]
 
 def format_news_for_prompt(ticker: str, articles: List[Dict[str, Any]]) -> str:
     """
@@ -76,9 +486,32 @@ def format_news_for_prompt(ticker: str, articles: List[Dict[str, Any]]) -> str:
         title = art.get("title") or f"Noticia {i}"
         link = art.get("link") or ""
 
+        # Historias sindicadas colapsadas: una sola entrada con todas sus fuentes
+        if art.get("sources", 1) > 1:
+            publisher = f"{', '.join(art.get('publishers') or [publisher])} ({art['sources']} fuentes)"
+
         lines.append(
             f"{i}. [{date_str}] {publisher}: {title}\n"
             f"   Link: {link}"
         )
 
     return "\n".join(lines)
+
+
+def build_news_prompt(ticker: str, articles: List[Dict[str, Any]]) -> tuple[str, Dict[str, Any]]:
+    """
+    Texto de noticias para el LLM con los titulares casi duplicados
+    colapsados en uno. Retorna (texto, reporte) con artículos y tokens
+    estimados antes y después del colapso.
+    """
+    collapsed = collapse_near_duplicates(articles)
+    text = format_news_for_prompt(ticker, collapsed)
+    tokens_before = estimate_tokens(format_news_for_prompt(ticker, articles))
+    tokens_after = estimate_tokens(text)
+    return text, {
+        "articles_before": len(articles),
+        "articles_after": len(collapsed),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+    }
@@ -0,0 +1,162 @@
+# core/panel.py
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from config import VOLATILITY_WINDOW, MOMENTUM_WINDOW
+from core.financial_data import price_column
+
+ANOMALY_WINDOW = 20          # mismo tramo que detect_return_anomaly
+ANOMALY_MIN_OBS = 5
+ANOMALY_SIGMA = 2.0
+
+
+# -------------------------------------------------------------
+# 1) PANEL FECHAS × TICKERS
+# -------------------------------------------------------------
+def build_price_panel(data: dict, field: str = "Close") -> pd.DataFrame:
+    """
+    Alinea { ticker: df } en un único DataFrame fechas × tickers con la
+    columna 'field'. Las fechas en que un ticker no cotiza quedan en NaN.
+    Acepta DataFrames o ColumnarPrices.
+    """
+    data = {t: df for t, df in data.items() if len(df) > 0}
+    dates = {t: np.asarray(price_column(df, "date")) for t, df in data.items()}
+    values = {t: np.asarray(price_column(df, field), dtype=float) for t, df in data.items()}
+
+    first_dates = next(iter(dates.values()), None)
+    if first_dates is not None and all(
+        len(d) == len(first_dates) and np.array_equal(d, first_dates) for d in dates.values()
+    ):
+        # Calendario común (lo habitual): se apilan los arrays sin alinear
+        panel = pd.DataFrame(
+            np.column_stack(list(values.values())),
+            index=pd.DatetimeIndex(pd.to_datetime(first_dates)),
+            columns=list(values),
+        )
+    else:
+        panel = pd.DataFrame({
+            t: pd.Series(values[t], index=pd.to_datetime(dates[t])) for t in values
+        })
+    panel = panel.sort_index()
+    panel.index.name = "date"
+    return panel
+
+
+def panel_returns(panel: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rendimientos simples de todo el panel (primera fila NaN).
+    """
+    values = panel.to_numpy(dtype=float)
+    ret = np.full(values.shape, np.nan)
+    ret[1:] = values[1:] / values[:-1] - 1.0
+    return pd.DataFrame(ret, index=panel.index, columns=panel.columns)
+
+
+def tail_block(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Últimas k filas de cada columna contando desde su último valor válido,
+    así un ticker sin la barra más reciente se evalúa en su propia última
+    barra (como lo hacen las funciones escalares). Retorna un array k × N.
+    """
+    n_rows, n_cols = values.shape
+    valid = ~np.isnan(values)
+    has_data = valid.any(axis=0)
+    last = np.where(has_data, n_rows - 1 - np.argmax(valid[::-1], axis=0), -1)
+
+    rows = last[None, :] - (k - 1) + np.arange(k)[:, None]
+    out = np.take_along_axis(values, np.clip(rows, 0, None), axis=0)
+    out[rows < 0] = np.nan
+    out[:, ~has_data] = np.nan
+    return out
+
+
+# -------------------------------------------------------------
+# 2) INDICADORES DE LA ÚLTIMA BARRA (TODOS LOS TICKERS A LA VEZ)
+# -------------------------------------------------------------
+def panel_indicators(
+    panel: pd.DataFrame,
+    vol_window: int = VOLATILITY_WINDOW,
+    mom_window: int = MOMENTUM_WINDOW,
+    annualize: bool = True,
+) -> pd.DataFrame:
+    """
+    Calcula en una pasada vectorizada, para cada ticker del panel:
+    - volatility: igual que compute_volatility
+    - momentum: igual que compute_momentum
+    - sigma / last_ret / anomaly: igual que detect_return_anomaly
+
+    Con calendarios comunes (sin huecos dentro de la ventana) coincide con
+    las funciones escalares. Retorna un DataFrame indexado por ticker.
+    """
+    prices = panel.to_numpy(dtype=float)
+    returns = panel_returns(panel).to_numpy()
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Volatilidad: últimos vol_window rendimientos válidos
+        vol_block = tail_block(returns, vol_window)
+        vol_obs = (~np.isnan(vol_block)).sum(axis=0)
+        vol = np.full(panel.shape[1], np.nan)
+        ok = vol_obs >= 2
+        vol[ok] = np.nanstd(vol_block[:, ok], axis=0, ddof=1)
+        if annualize:
+            vol *= 252 ** 0.5
+
+        # Momentum: precio actual / precio de hace mom_window barras - 1
+        mom_block = tail_block(prices, mom_window + 1)
+        momentum = mom_block[-1] / mom_block[0] - 1.0
+
+        # Z-score del último rendimiento sobre los últimos 20
+        z_block = tail_block(returns, ANOMALY_WINDOW)
+        z_obs = (~np.isnan(z_block)).sum(axis=0)
+        sigma = np.zeros(panel.shape[1])
+        last_ret = z_block[-1]
+        ok = z_obs >= ANOMALY_MIN_OBS
+        mean = np.nanmean(z_block[:, ok], axis=0)
+        std = np.nanstd(z_block[:, ok], axis=0, ddof=1)
+        sigma[ok] = np.where(std > 0, (last_ret[ok] - mean) / std, 0.0)
+
+    return pd.DataFrame(
+        {
+            "volatility": vol,
+            "momentum": momentum,
+            "sigma": sigma,
+            "last_ret": np.where(ok, last_ret, np.nan),
+            "anomaly": np.abs(sigma) >= ANOMALY_SIGMA,
+        },
+        index=panel.columns,
+    )
+
+
+# -------------------------------------------------------------
+# 3) SERIES RODANTES COMPLETAS (TODAS LAS FECHAS Y TICKERS)
+# -------------------------------------------------------------
+def panel_rolling(
+    panel: pd.DataFrame,
+    vol_window: int = VOLATILITY_WINDOW,
+    mom_window: int = MOMENTUM_WINDOW,
+    annualize: bool = True,
+) -> dict[str, pd.DataFrame]:
+    """
+    Indicadores para cada fecha del panel (cada fila usa solo datos hasta
+    esa fecha): 'ret', 'volatility', 'momentum' y 'zscore'.
+    """
+    ret = panel_returns(panel)
+
+    vol = ret.rolling(vol_window, min_periods=2).std()
+    if annualize:
+        vol = vol * 252 ** 0.5
+
+    momentum = panel / panel.shift(mom_window) - 1.0
+
+    roll = ret.rolling(ANOMALY_WINDOW, min_periods=ANOMALY_MIN_OBS)
+    std = roll.std()
+    zscore = ((ret - roll.mean()) / std).where(std > 0, 0.0).where(std.notna())
+
+    return {
+        "ret": ret,
+        "volatility": vol,
+        "momentum": momentum,
+        "zscore": zscore,
+    }
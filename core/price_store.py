@@ -0,0 +1,196 @@
+# core/price_store.py
+from __future__ import annotations
+
+import os
+import threading
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    delete,
+    func,
+    select,
+)
+
+from config import PRICE_STORE_URL
+
+# Columnas del DataFrame de la app -> columnas de la tabla
+PRICE_COLUMNS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Adj Close": "adj_close",
+    "Volume": "volume",
+}
+
+
+# -------------------------------------------------------------
+# STORE OHLCV EN DISCO (SQLite / cualquier URL de SQLAlchemy)
+# -------------------------------------------------------------
+class PriceStore:
+    """
+    Histórico OHLCV persistente, con clave (ticker, interval, date).
+    Las actualizaciones solo escriben las barras nuevas (append-only),
+    reemplazando la última barra guardada por si estaba incompleta.
+    """
+
+    def __init__(self, url: str = PRICE_STORE_URL):
+        connect_args = {}
+        if url.startswith("sqlite:///"):
+            os.makedirs(os.path.dirname(url[len("sqlite:///"):]) or ".", exist_ok=True)
+            # Streamlit atiende cada sesión en un hilo distinto
+            connect_args = {"check_same_thread": False}
+
+        self.engine = create_engine(url, connect_args=connect_args)
+        self.metadata = MetaData()
+        self.prices = Table(
+            "prices",
+            self.metadata,
+            Column("ticker", String(16), primary_key=True),
+            Column("interval", String(8), primary_key=True),
+            Column("date", DateTime, primary_key=True),
+            Column("open", Float),
+            Column("high", Float),
+            Column("low", Float),
+            Column("close", Float),
+            Column("adj_close", Float),
+            Column("volume", BigInteger),
+        )
+        self.metadata.create_all(self.engine)
+
+    def last_dates(self, tickers: list[str], interval: str) -> dict[str, pd.Timestamp]:
+        """
+        Última fecha guardada por ticker (solo tickers con datos).
+        """
+        p = self.prices
+        stmt = (
+            select(p.c.ticker, func.max(p.c.date))
+            .where(p.c.interval == interval, p.c.ticker.in_(tickers))
+            .group_by(p.c.ticker)
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+        return {t: pd.Timestamp(d) for t, d in rows if d is not None}
+
+    def tail(self, tickers: list[str], interval: str, n: int = 2) -> dict[str, pd.DataFrame]:
+        """
+        Últimas 'n' barras guardadas de cada ticker (solo tickers con datos),
+        en el formato de load().
+        """
+        p = self.prices
+        ranked = (
+            select(
+                p.c.ticker,
+                p.c.date,
+                *[p.c[dst] for dst in PRICE_COLUMNS.values()],
+                func.row_number().over(partition_by=p.c.ticker, order_by=p.c.date.desc()).label("rn"),
+            )
+            .where(p.c.interval == interval, p.c.ticker.in_(tickers))
+            .subquery()
+        )
+        stmt = select(ranked).where(ranked.c.rn <= n).order_by(ranked.c.ticker, ranked.c.date)
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+
+        frame = pd.DataFrame(rows, columns=["ticker", "date", *PRICE_COLUMNS.keys(), "rn"])
+        frame["date"] = pd.to_datetime(frame["date"])
+        return {
+            t: g.drop(columns=["ticker", "rn"]).reset_index(drop=True)
+            for t, g in frame.groupby("ticker", sort=False)
+        }
+
+    def delete(self, ticker: str, interval: str) -> None:
+        """
+        Borra todo el histórico guardado del ticker en ese intervalo.
+        """
+        p = self.prices
+        with self.engine.begin() as conn:
+            conn.execute(delete(p).where(p.c.ticker == ticker, p.c.interval == interval))
+
+    def upsert(self, ticker: str, interval: str, df: pd.DataFrame) -> int:
+        """
+        Guarda las barras de df. Las filas con fecha >= la primera barra de df
+        se reemplazan. Retorna el número de filas escritas.
+        """
+        if df.empty:
+            return 0
+
+        dates = pd.to_datetime(df["date"])
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+
+        records = pd.DataFrame({"date": dates.dt.to_pydatetime()})
+        for src, dst in PRICE_COLUMNS.items():
+            if src in df.columns:
+                values = df[src].to_numpy()
+                if dst == "volume":
+                    records[dst] = pd.Series(values).fillna(0).astype("int64")
+                else:
+                    records[dst] = values.astype(float)
+            else:
+                records[dst] = None
+        records["ticker"] = ticker
+        records["interval"] = interval
+
+        p = self.prices
+        with self.engine.begin() as conn:
+            conn.execute(
+                delete(p).where(
+                    p.c.ticker == ticker,
+                    p.c.interval == interval,
+                    p.c.date >= records["date"].iloc[0],
+                )
+            )
+            conn.execute(p.insert(), records.to_dict("records"))
+        return len(records)
+
+    def load(
+        self,
+        ticker: str,
+        interval: str,
+        start: Optional[pd.Timestamp] = None,
+    ) -> pd.DataFrame:
+        """
+        Lee el histórico guardado en el mismo formato que download_history
+        (columna 'date' + Open, High, Low, Close, Adj Close, Volume).
+        """
+        p = self.prices
+        stmt = (
+            select(p.c.date, *[p.c[dst] for dst in PRICE_COLUMNS.values()])
+            .where(p.c.ticker == ticker, p.c.interval == interval)
+            .order_by(p.c.date)
+        )
+        if start is not None:
+            stmt = stmt.where(p.c.date >= start.to_pydatetime())
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+
+        df = pd.DataFrame(rows, columns=["date", *PRICE_COLUMNS.keys()])
+        df["date"] = pd.to_datetime(df["date"])
+        df.attrs["ticker"] = ticker
+        return df
+
+
+_store: Optional[PriceStore] = None
+_store_lock = threading.Lock()
+
+
+def get_price_store() -> PriceStore:
+    """
+    Store compartido por todo el proceso (todas las sesiones de Streamlit).
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PriceStore()
+        return _store
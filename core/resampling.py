@@ -0,0 +1,96 @@
+# core/resampling.py
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from config import DERIVED_CACHE_SIZE
+from core.financial_data import price_column, history_key, is_cacheable
+
+# Frecuencia derivada -> regla de pandas
+FREQUENCIES = {
+    "W": "W-FRI",    # semanas que cierran en viernes
+    "M": "ME",       # fin de mes
+}
+
+# Reducción de cada columna dentro del periodo
+OHLCV_AGG = {
+    "date": "last",
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Adj Close": "last",
+    "Volume": "sum",
+}
+
+_bars_cache: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+_bars_lock = threading.Lock()
+
+
+# -------------------------------------------------------------
+# 1) REMUESTREO OHLCV
+# -------------------------------------------------------------
+def resample_ohlcv(df, freq: str) -> pd.DataFrame:
+    """
+    Construye barras semanales ('W') o mensuales ('M') a partir de barras
+    diarias: first/max/min/last/sum por periodo. La fecha de cada barra es
+    la del último día con datos del periodo, así que la última barra de un
+    periodo en curso queda con la fecha real más reciente.
+    Acepta DataFrames o ColumnarPrices.
+    """
+    rule = FREQUENCIES[freq]
+    dates = pd.DatetimeIndex(pd.to_datetime(price_column(df, "date")))
+    fields = [f for f in OHLCV_AGG if f in df.columns]
+    frame = pd.DataFrame({f: price_column(df, f) for f in fields}, index=dates)
+
+    bars = (
+        frame.resample(rule)
+        .agg({f: OHLCV_AGG[f] for f in fields})
+        .dropna(subset=["Close"])
+        .reset_index(drop=True)
+    )
+
+    ticker = history_key(df)[0]
+    # Ticker propio por frecuencia: los caches derivados no se mezclan con el diario
+    bars.attrs["ticker"] = f"{ticker}@{freq}"
+    bars.attrs["freq"] = freq
+    return bars
+
+
+def get_bars(df, freq: str = "D"):
+    """
+    Barras del histórico a la frecuencia pedida ('D' devuelve df tal cual).
+    Las barras derivadas se guardan en un cache LRU por versión del histórico,
+    así que pedirlas de nuevo con los mismos datos no recalcula nada
+    (los históricos sin ticker se recalculan siempre).
+    """
+    if freq == "D":
+        return df
+
+    version = history_key(df)
+    if not is_cacheable(version):
+        return resample_ohlcv(df, freq)
+
+    key = (version, freq)
+    with _bars_lock:
+        cached = _bars_cache.get(key)
+        if cached is not None:
+            _bars_cache.move_to_end(key)
+            return cached
+
+    bars = resample_ohlcv(df, freq)
+    with _bars_lock:
+        _bars_cache[key] = bars
+        while len(_bars_cache) > DERIVED_CACHE_SIZE:
+            _bars_cache.popitem(last=False)
+    return bars
+
+
+def resample_all(data: dict, freq: str) -> dict[str, pd.DataFrame]:
+    """
+    get_bars para todo el universo { ticker: df }.
+    """
+    return {t: get_bars(df, freq) for t, df in data.items()}
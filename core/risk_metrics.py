@@ -0,0 +1,116 @@
+# core/risk_metrics.py
+from __future__ import annotations
+
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+
+from config import RISK_WINDOW, ATR_WINDOW, VAR_CONFIDENCE
+from core.panel import build_price_panel, panel_returns, tail_block
+
+
+# -------------------------------------------------------------
+# 1) SERIES COMPLETAS (TODAS LAS FECHAS Y TICKERS)
+# -------------------------------------------------------------
+def panel_drawdown(close: pd.DataFrame) -> pd.DataFrame:
+    """
+    Caída de cada fecha respecto al máximo previo (0 en máximos, negativa
+    debajo). El máximo acumulado ignora los NaN de fechas sin cotización.
+    """
+    values = close.to_numpy(dtype=float)
+    running_max = np.fmax.accumulate(values, axis=0)
+    return pd.DataFrame(values / running_max - 1.0, index=close.index, columns=close.columns)
+
+
+def true_range(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rango verdadero: max(High - Low, |High - Close previo|, |Low - Close previo|).
+    En la primera barra (sin cierre previo) es High - Low.
+    """
+    h = high.to_numpy(dtype=float)
+    l = low.to_numpy(dtype=float)
+    prev = np.full(h.shape, np.nan)
+    prev[1:] = close.to_numpy(dtype=float)[:-1]
+    tr = np.fmax(np.fmax(h - l, np.abs(h - prev)), np.abs(l - prev))
+    return pd.DataFrame(tr, index=close.index, columns=close.columns)
+
+
+def panel_atr(
+    high: pd.DataFrame,
+    low: pd.DataFrame,
+    close: pd.DataFrame,
+    window: int = ATR_WINDOW,
+) -> pd.DataFrame:
+    """
+    ATR: media móvil simple del rango verdadero en 'window' barras.
+    """
+    return true_range(high, low, close).rolling(window, min_periods=1).mean()
+
+
+# -------------------------------------------------------------
+# 2) MÉTRICAS DE LA ÚLTIMA BARRA (TODOS LOS TICKERS A LA VEZ)
+# -------------------------------------------------------------
+def risk_metrics(
+    data: dict,
+    window: int = RISK_WINDOW,
+    atr_window: int = ATR_WINDOW,
+    confidence: float = VAR_CONFIDENCE,
+) -> pd.DataFrame:
+    """
+    Para cada ticker de { ticker: df }, en una pasada vectorizada:
+    - max_drawdown / drawdown: caída máxima y actual en las últimas 'window' barras
+    - atr / atr_pct: ATR de 'atr_window' barras, en precio y relativo al cierre
+    - var / cvar: pérdida diaria histórica al nivel 'confidence' y pérdida
+      media más allá de ese nivel (positivas = pérdida), sobre 'window' rendimientos
+    Retorna un DataFrame indexado por ticker.
+    """
+    close = build_price_panel(data, "Close")
+    high = build_price_panel(data, "High").reindex_like(close)
+    low = build_price_panel(data, "Low").reindex_like(close)
+    prices = close.to_numpy(dtype=float)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Drawdown: máximo acumulado dentro de la ventana de cada ticker
+        block = tail_block(prices, window)
+        drawdown = block / np.fmax.accumulate(block, axis=0) - 1.0
+        max_drawdown = np.nanmin(np.where(np.isnan(drawdown), np.inf, drawdown), axis=0)
+        max_drawdown[np.isinf(max_drawdown)] = np.nan
+        last_close = tail_block(prices, 1)[0]
+
+        # ATR: últimas atr_window barras de rango verdadero
+        tr_block = tail_block(true_range(high, low, close).to_numpy(), atr_window)
+        tr_obs = (~np.isnan(tr_block)).sum(axis=0)
+        atr = np.where(tr_obs > 0, np.nansum(tr_block, axis=0) / tr_obs, np.nan)
+
+        # VaR / CVaR históricos sobre los últimos 'window' rendimientos
+        ret_block = tail_block(panel_returns(close).to_numpy(), window)
+        ret_obs = (~np.isnan(ret_block)).sum(axis=0)
+        var = np.full(close.shape[1], np.nan)
+        cvar = np.full(close.shape[1], np.nan)
+        ok = ret_obs >= 2
+        if ok.any():
+            q = np.nanquantile(ret_block[:, ok], 1 - confidence, axis=0)
+            tail = ret_block[:, ok] <= q
+            var[ok] = -q
+            cvar[ok] = -np.nansum(np.where(tail, ret_block[:, ok], 0.0), axis=0) / tail.sum(axis=0)
+
+    return pd.DataFrame(
+        {
+            "max_drawdown": max_drawdown,
+            "drawdown": drawdown[-1],
+            "atr": atr,
+            "atr_pct": atr / last_close,
+            "var": var,
+            "cvar": cvar,
+        },
+        index=close.columns,
+    )
+
+
+def ticker_risk(ticker: str, df, **kwargs) -> Dict[str, Any]:
+    """
+    risk_metrics de un solo ticker como dict (para el contexto macro).
+    """
+    row = risk_metrics({ticker: df}, **kwargs).iloc[0]
+    return {key: float(value) for key, value in row.items()}
@@ -0,0 +1,131 @@
+# core/seasonality.py
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Dimensión -> número de casillas (el índice es el valor: mes 1-12, día 1-31)
+DIMENSIONS = {
+    "month": 13,
+    "weekday": 7,
+    "day": 32,
+}
+
+
+def date_keys(date: pd.Timestamp) -> dict[str, int]:
+    return {"month": date.month, "weekday": date.weekday(), "day": date.day}
+
+
+# -------------------------------------------------------------
+# CUBO DE ESTACIONALIDAD (MES / DÍA DE SEMANA / DÍA DEL MES)
+# -------------------------------------------------------------
+class SeasonalityCube:
+    """
+    Suma, conteo y suma de cuadrados de los rendimientos por mes, día de la
+    semana y día del mes. Se construye en una sola pasada sobre el histórico
+    y luego se actualiza en sitio con cada barra nueva.
+    """
+
+    def __init__(self):
+        self.sums = {d: np.zeros(n) for d, n in DIMENSIONS.items()}
+        self.sumsq = {d: np.zeros(n) for d, n in DIMENSIONS.items()}
+        self.counts = {d: np.zeros(n, dtype=np.int64) for d, n in DIMENSIONS.items()}
+        # Filas vistas (aunque su rendimiento sea NaN), igual que groupby
+        self.rows = {d: np.zeros(n, dtype=np.int64) for d, n in DIMENSIONS.items()}
+        self.n_bars = 0
+        self.last_date = None
+        self.last_close = float("nan")
+        # Datos de la última barra, para poder reemplazarla si se corrige
+        self._prev_close = float("nan")
+        self._last_ret = float("nan")
+
+    @classmethod
+    def from_arrays(cls, dates, closes) -> "SeasonalityCube":
+        """
+        Construye el cubo a partir de fechas y cierres en una sola pasada.
+        """
+        cube = cls()
+        dates = pd.DatetimeIndex(pd.to_datetime(dates))
+        closes = np.asarray(closes, dtype=float)
+        n = len(closes)
+        if n == 0:
+            return cube
+
+        ret = np.full(n, np.nan)
+        ret[1:] = closes[1:] / closes[:-1] - 1.0
+        valid = ~np.isnan(ret)
+        ret_0 = np.where(valid, ret, 0.0)
+
+        keys = {"month": dates.month, "weekday": dates.weekday, "day": dates.day}
+        for dim, size in DIMENSIONS.items():
+            k = np.asarray(keys[dim])
+            cube.sums[dim] = np.bincount(k, weights=ret_0, minlength=size)
+            cube.sumsq[dim] = np.bincount(k, weights=ret_0 ** 2, minlength=size)
+            cube.counts[dim] = np.bincount(k, weights=valid, minlength=size).astype(np.int64)
+            cube.rows[dim] = np.bincount(k, minlength=size).astype(np.int64)
+
+        cube.n_bars = n
+        cube.last_date = dates[-1]
+        cube.last_close = float(closes[-1])
+        cube._prev_close = float(closes[-2]) if n > 1 else float("nan")
+        cube._last_ret = float(ret[-1])
+        return cube
+
+    def _apply(self, date: pd.Timestamp, ret: float, sign: int) -> None:
+        for dim, k in date_keys(date).items():
+            self.rows[dim][k] += sign
+            if not math.isnan(ret):
+                self.sums[dim][k] += sign * ret
+                self.sumsq[dim][k] += sign * ret * ret
+                self.counts[dim][k] += sign
+
+    def add_bar(self, date, close: float) -> None:
+        """
+        Agrega una barra nueva en O(1). Si la fecha es la de la última barra,
+        la reemplaza (por ejemplo, una barra diaria que aún no cerraba).
+        """
+        date = pd.Timestamp(date)
+        close = float(close)
+
+        if self.last_date is not None and date == self.last_date:
+            self._apply(date, self._last_ret, -1)
+            self.n_bars -= 1
+            self.last_close = self._prev_close
+        elif self.last_date is not None and date < self.last_date:
+            raise ValueError(f"Barra fuera de orden: {date} < {self.last_date}")
+
+        ret = close / self.last_close - 1.0
+        self._apply(date, ret, +1)
+
+        self.n_bars += 1
+        self.last_date = date
+        self._prev_close = self.last_close
+        self.last_close = close
+        self._last_ret = ret
+
+    def table(self, dim: str) -> pd.DataFrame:
+        """
+        Mismo formato que seasonality_by_month/weekday/month_day:
+        columnas [dim, 'avg_return', 'count'], solo con las casillas vistas.
+        """
+        present = np.nonzero(self.rows[dim])[0]
+        counts = self.counts[dim][present]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg = self.sums[dim][present] / counts
+        avg = np.where(counts > 0, avg, np.nan)
+        return pd.DataFrame({
+            dim: present.astype(np.int32),
+            "avg_return": avg,
+            "count": counts,
+        })
+
+    def std(self, dim: str) -> np.ndarray:
+        """
+        Desviación estándar muestral por casilla (NaN con menos de 2 datos).
+        """
+        n = self.counts[dim].astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = (self.sumsq[dim] - self.sums[dim] ** 2 / n) / (n - 1)
+        return np.sqrt(np.where(n > 1, np.maximum(var, 0.0), np.nan))
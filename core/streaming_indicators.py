@@ -0,0 +1,215 @@
+# core/streaming_indicators.py
+from __future__ import annotations
+
+import math
+from typing import Dict, Any
+
+import numpy as np
+
+from config import VOLATILITY_WINDOW, MOMENTUM_WINDOW
+from core.financial_data import PERIODS_PER_YEAR, periods_per_year, price_column
+
+ANOMALY_WINDOW = 20
+ANOMALY_MIN_OBS = 5
+
+# Cada cuántos reemplazos se recalcula la ventana desde cero para que el
+# error de redondeo acumulado no crezca (costo amortizado O(1))
+RESYNC_EVERY = 1000
+
+
+# -------------------------------------------------------------
+# 1) MEDIA / VARIANZA RODANTE EN O(1)
+# -------------------------------------------------------------
+class RollingWindowStats:
+    """
+    Media y varianza muestral de los últimos 'size' valores.
+    Usa la actualización de Welford: al entrar un valor nuevo con la ventana
+    llena, el más antiguo sale del buffer circular en la misma operación.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._buf = np.zeros(size)
+        self._pos = 0
+        self._replaced = 0
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def push(self, x: float) -> None:
+        if self.count < self.size:
+            self.count += 1
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self._m2 += delta * (x - self.mean)
+        else:
+            old = self._buf[self._pos]
+            old_mean = self.mean
+            self.mean += (x - old) / self.size
+            self._m2 += (x - old) * (x - self.mean + old - old_mean)
+            self._replaced += 1
+
+        self._buf[self._pos] = x
+        self._pos = (self._pos + 1) % self.size
+
+        if self._replaced >= RESYNC_EVERY:
+            self._resync()
+
+    def replace_last(self, x: float) -> None:
+        """
+        Sustituye el valor más reciente (p. ej. una barra que aún no había
+        cerrado) sin tocar el resto de la ventana.
+        """
+        if self.count == 0:
+            self.push(x)
+            return
+        last = self._pos - 1
+        old = self._buf[last]
+        old_mean = self.mean
+        self.mean += (x - old) / self.count
+        self._m2 += (x - old) * (x - self.mean + old - old_mean)
+        self._buf[last] = x
+        self._replaced += 1
+
+        if self._replaced >= RESYNC_EVERY:
+            self._resync()
+
+    def _resync(self) -> None:
+        # Mientras la ventana no se llena, los valores ocupan las primeras posiciones
+        values = self._buf[: self.count]
+        self._replaced = 0
+        self.mean = float(values.mean())
+        self._m2 = float(((values - self.mean) ** 2).sum())
+
+    @property
+    def variance(self) -> float:
+        if self.count < 2:
+            return float("nan")
+        return max(self._m2, 0.0) / (self.count - 1)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def last(self) -> float:
+        return float(self._buf[self._pos - 1])
+
+
+# -------------------------------------------------------------
+# 2) INDICADORES INCREMENTALES DE UN TICKER
+# -------------------------------------------------------------
+class StreamingIndicators:
+    """
+    Volatilidad, momentum y z-score del último rendimiento, actualizados
+    barra a barra en tiempo constante. Da los mismos valores que
+    compute_volatility, compute_momentum y detect_return_anomaly sobre
+    el histórico completo. 'periods_per_year' es el número de barras por
+    año con que se anualiza la volatilidad (252 para barras diarias).
+    """
+
+    def __init__(
+        self,
+        vol_window: int = VOLATILITY_WINDOW,
+        mom_window: int = MOMENTUM_WINDOW,
+        anomaly_window: int = ANOMALY_WINDOW,
+        periods_per_year: float = PERIODS_PER_YEAR["D"],
+    ):
+        self.vol_window = vol_window
+        self.mom_window = mom_window
+        self.periods_per_year = periods_per_year
+        self._closes = np.zeros(mom_window + 1)
+        self._close_pos = 0
+        self._n_closes = 0
+        self.last_close = float("nan")
+        self._vol = RollingWindowStats(vol_window)
+        self._anomaly = RollingWindowStats(anomaly_window)
+
+    @classmethod
+    def from_history(cls, df, **kwargs) -> "StreamingIndicators":
+        """
+        Inicializa el estado con el histórico de un DataFrame o ColumnarPrices
+        (por defecto, con las barras por año de ese histórico).
+        """
+        kwargs.setdefault("periods_per_year", periods_per_year(df))
+        state = cls(**kwargs)
+        for close in price_column(df, "Close"):
+            state.update(close)
+        return state
+
+    def update(self, close: float) -> None:
+        """
+        Agrega el cierre de una barra nueva. Las barras sin precio se ignoran.
+        """
+        close = float(close)
+        if math.isnan(close):
+            return
+
+        if not math.isnan(self.last_close):
+            ret = close / self.last_close - 1.0
+            self._vol.push(ret)
+            self._anomaly.push(ret)
+        self.last_close = close
+
+        self._closes[self._close_pos] = close
+        self._close_pos = (self._close_pos + 1) % len(self._closes)
+        self._n_closes += 1
+
+    def replace_last(self, close: float) -> None:
+        """
+        Sustituye el cierre de la última barra (una barra diaria parcial que
+        luego cierra con otro precio). Las barras sin precio se ignoran.
+        """
+        close = float(close)
+        if math.isnan(close):
+            return
+        if self._n_closes == 0:
+            self.update(close)
+            return
+
+        if self._n_closes > 1:
+            previous = self._closes[(self._close_pos - 2) % len(self._closes)]
+            ret = close / previous - 1.0
+            self._vol.replace_last(ret)
+            self._anomaly.replace_last(ret)
+        self.last_close = close
+        self._closes[(self._close_pos - 1) % len(self._closes)] = close
+
+    @property
+    def last_return(self) -> float:
+        if self._n_closes < 2:
+            return float("nan")
+        return self._vol.last
+
+    def volatility(self, annualize: bool = True) -> float:
+        vol = self._vol.std
+        if annualize:
+            vol *= self.periods_per_year ** 0.5
+        return vol
+
+    def momentum(self) -> float:
+        if self._n_closes < self.mom_window + 1:
+            return float("nan")
+        # Con el buffer lleno, la posición de escritura apunta al cierre más antiguo
+        return self.last_close / self._closes[self._close_pos] - 1.0
+
+    def anomaly(self) -> Dict[str, Any]:
+        stats = self._anomaly
+        if stats.count < ANOMALY_MIN_OBS:
+            return {"anomaly": False, "sigma": 0}
+
+        std = stats.std
+        last_ret = stats.last
+        z = (last_ret - stats.mean) / std if std > 0 else 0
+        return {
+            "anomaly": abs(z) >= 2,
+            "sigma": float(z),
+            "last_ret": last_ret,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "volatility": self.volatility(),
+            "momentum": self.momentum(),
+            "anomaly_info": self.anomaly(),
+        }
@@ -0,0 +1,75 @@
+# tests/fake_marketaux.py
+import datetime as dt
+from typing import Dict, List, Optional
+
+
+class FakeResponse:
+    def __init__(self, body: dict, status_code: int = 200):
+        self.body = body
+        self.status_code = status_code
+        self.text = "" if status_code == 200 else "error"
+
+    def json(self) -> dict:
+        return self.body
+
+
+class FakeSession:
+    """
+    MarketAux falso para get_session(): filtra por símbolos y
+    'published_after', ordena según 'sort_order', pagina y recorta cada
+    página a 'plan_cap' artículos como hace el plan. Con 'fail', todas las
+    peticiones responden 500. Guarda los parámetros de cada petición.
+    """
+
+    def __init__(self, articles: List[dict], plan_cap: int = 50, fail: bool = False):
+        self.articles = articles
+        self.plan_cap = plan_cap
+        self.fail = fail
+        self.calls: List[dict] = []
+
+    def get(self, url: str, params: Optional[dict] = None, timeout: Optional[float] = None) -> FakeResponse:
+        self.calls.append(dict(params))
+        if self.fail:
+            return FakeResponse({}, status_code=500)
+
+        symbols = set(params["symbols"].split(","))
+        hits = [
+            a for a in self.articles
+            if symbols & set(a["symbols"]) and a["published_at"] > params["published_after"]
+        ]
+        hits.sort(key=lambda a: a["published_at"], reverse=params.get("sort_order") != "asc")
+
+        limit = min(int(params["limit"]), self.plan_cap)
+        page = int(params.get("page", 1))
+        chunk = hits[(page - 1) * limit: page * limit]
+        data = [
+            {
+                "uuid": a["id"],
+                "title": a["id"],
+                "url": f"https://news.test/{a['id']}",
+                "source": "test",
+                "published_at": a["published_at"],
+                "entities": [{"symbol": s} for s in a["symbols"]],
+            }
+            for a in chunk
+        ]
+        meta = {"found": len(hits), "returned": len(data), "limit": limit, "page": page}
+        return FakeResponse({"meta": meta, "data": data})
+
+
+def make_articles(counts: Dict[str, int], newest: Optional[dt.datetime] = None) -> List[dict]:
+    """
+    'n' artículos por ticker, uno por minuto hacia atrás desde 'newest'
+    (por defecto, hace una hora), en el orden de 'counts'.
+    """
+    newest = newest or dt.datetime.utcnow() - dt.timedelta(hours=1)
+    articles = []
+    for ticker, n in counts.items():
+        for i in range(n):
+            published = newest - dt.timedelta(minutes=len(articles))
+            articles.append({
+                "id": f"{ticker}-{i}",
+                "symbols": [ticker],
+                "published_at": published.strftime("%Y-%m-%dT%H:%M:%S.000000Z"),
+            })
+    return articles
@@ -0,0 +1,77 @@
+# tests/test_alert_engine.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import MOMENTUM_WINDOW
+from core.alert_engine import AlertEngine
+from core.streaming_indicators import ANOMALY_WINDOW
+
+
+def _history(n: int, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"date": pd.bdate_range("2021-01-01", periods=n), "Close": close})
+
+
+def _rules(alerts: list[dict]) -> set:
+    return {a["rule"] for a in alerts}
+
+
+def test_bar_by_bar_ticker_stays_quiet_until_warm():
+    df = _history(200)
+    engine = AlertEngine()
+    warm_after = max(ANOMALY_WINDOW, MOMENTUM_WINDOW)
+
+    # Un desplome en la cuarta barra no alerta: aún no hay ventanas llenas
+    closes = df["Close"].copy()
+    closes.iloc[3] = closes.iloc[2] * 0.8
+    for date, close in zip(df["date"].iloc[:warm_after], closes.iloc[:warm_after]):
+        assert engine.on_bar("AAA", date, close) == []
+    assert engine.since(0) == []
+
+    # Con las ventanas llenas, el mismo desplome sí alerta
+    for date, close in zip(df["date"].iloc[warm_after:-1], closes.iloc[warm_after:-1]):
+        engine.on_bar("AAA", date, close)
+    fired = engine.on_bar("AAA", df["date"].iloc[-1], closes.iloc[-2] * 0.8)
+    assert "anomaly" in _rules(fired)
+
+
+def test_partial_bar_is_replaced_by_the_real_close():
+    df = _history(200)
+    engine = AlertEngine()
+    engine.prime("AAA", df)
+
+    last = df["Close"].iloc[-1]
+    day = df["date"].iloc[-1] + pd.offsets.BDay()
+    assert engine.on_bar("AAA", day, last * 1.001) == []
+
+    fired = engine.on_bar("AAA", day, last * 0.9)
+    assert "anomaly" in _rules(fired)
+    assert engine._states["AAA"].indicators.last_close == pytest.approx(last * 0.9)
+
+    # Repetir la misma barra no vuelve a disparar
+    assert engine.on_bar("AAA", day, last * 0.9) == []
+
+
+def test_on_history_replaces_a_changed_last_bar():
+    df = _history(200)
+    engine = AlertEngine()
+    engine.on_history("AAA", df.iloc[:-1])
+
+    partial = df.copy()
+    partial.loc[partial.index[-1], "Close"] = df["Close"].iloc[-2] * 1.001
+    engine.on_history("AAA", partial)
+
+    closed = df.copy()
+    closed.loc[closed.index[-1], "Close"] = df["Close"].iloc[-2] * 0.9
+    fired = engine.on_history("AAA", closed)
+    assert "anomaly" in _rules(fired)
+
+    # El estado queda igual que si solo hubiera visto la barra cerrada
+    fresh = AlertEngine()
+    fresh.prime("AAA", closed)
+    got, expected = engine._states["AAA"], fresh._states["AAA"]
+    assert got.indicators.snapshot()["momentum"] == pytest.approx(expected.indicators.snapshot()["momentum"])
+    assert got.indicators.volatility() == pytest.approx(expected.indicators.volatility())
+    assert got.baseline.std == pytest.approx(expected.baseline.std)
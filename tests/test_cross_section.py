@@ -0,0 +1,79 @@
+# tests/test_cross_section.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import core.cross_section as cs
+from core.cross_section import RESYNC_EVERY, RollingCovariance, relative_to_benchmark
+from core.panel import build_price_panel, panel_returns
+
+TICKERS = ["SPY", "AAA", "BBB", "CCC"]
+
+
+def _data(n: int, seed: int = 11) -> dict:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2019-01-01", periods=n)
+    market = rng.normal(0, 0.01, n)
+    data = {}
+    for i, t in enumerate(TICKERS):
+        ret = 0.5 * i * market + rng.normal(0, 0.01, n) + (market if t == "SPY" else 0)
+        data[t] = pd.DataFrame({"date": dates, "Close": 100 * np.exp(np.cumsum(ret))})
+    return data
+
+
+def _reference_cov(data: dict, window: int) -> pd.DataFrame:
+    # Cálculo completo: últimas 'window' fechas con rendimiento de todos los tickers
+    return panel_returns(build_price_panel(data)).dropna().tail(window).cov()
+
+
+def _assert_cov(state: RollingCovariance, expected: pd.DataFrame) -> None:
+    got = state.cov().loc[expected.index, expected.columns]
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), rtol=1e-8, atol=1e-14)
+
+
+def test_incremental_updates_match_pandas_cov():
+    data = _data(RESYNC_EVERY + 200)
+    panel = build_price_panel(data)
+    state = RollingCovariance.from_panel(panel.iloc[:100], window=30)
+    for n in (101, 150, RESYNC_EVERY + 50, len(panel)):
+        state.update_from_panel(panel.iloc[:n])
+        _assert_cov(state, _reference_cov({t: df.iloc[:n] for t, df in data.items()}, 30))
+
+
+def test_dates_with_missing_ticker_are_skipped():
+    data = _data(200)
+    gap = data["BBB"].drop(index=[120, 121]).reset_index(drop=True)
+    data = {**data, "BBB": gap}
+    state = RollingCovariance.from_panel(build_price_panel({t: df.iloc[:100] for t, df in data.items()}), 40)
+    state.update_from_panel(build_price_panel(data))
+    _assert_cov(state, _reference_cov(data, 40))
+
+
+def test_beta_and_dispersion():
+    data = _data(300)
+    state = RollingCovariance.from_panel(build_price_panel(data), 60)
+    for t in TICKERS[1:]:
+        expected = relative_to_benchmark(data[t], data["SPY"], window=60)
+        got = state.benchmark_info(t)
+        assert got["beta"] == pytest.approx(expected["beta"], rel=1e-8)
+        assert got["correlation"] == pytest.approx(expected["correlation"], rel=1e-8)
+        assert got["days"] == expected["days"]
+        assert state.beta()[t] == pytest.approx(expected["beta"], rel=1e-8)
+    last = panel_returns(build_price_panel(data)).iloc[-1].to_numpy()
+    assert state.dispersion() == pytest.approx(np.std(last, ddof=1))
+
+
+def test_shared_state_feeds_only_new_rows(monkeypatch):
+    monkeypatch.setattr(cs, "_shared", None)
+    data = _data(400)
+    cs.update_cross_section({t: df.iloc[:350] for t, df in data.items()}, window=60)
+    state = cs.update_cross_section(data, window=60)
+    assert state.last_date == data["SPY"]["date"].iloc[-1]
+    _assert_cov(state, _reference_cov(data, 60))
+
+    info = cs.shared_cross_section_info("AAA", data["AAA"]["date"].iloc[-1])
+    assert info["benchmark_info"]["beta"] == pytest.approx(
+        relative_to_benchmark(data["AAA"], data["SPY"], window=60)["beta"], rel=1e-8
+    )
+    # Un estado atrasado respecto al histórico no se usa
+    assert cs.shared_cross_section_info("AAA", data["AAA"]["date"].iloc[-2]) is None
@@ -0,0 +1,18 @@
+# tests/test_download_scheduler.py
+import time
+
+from core.download_scheduler import TokenBucket
+
+
+def test_token_bucket_charges_every_symbol():
+    bucket = TokenBucket(rate=100, capacity=5)
+
+    # Un chunk más grande que la ráfaga sale con el bucket lleno y deja deuda
+    start = time.monotonic()
+    bucket.acquire(20)
+    assert time.monotonic() - start < 0.05
+
+    # La siguiente petición paga la deuda: (20 - 5 + 1) / 100 s
+    start = time.monotonic()
+    bucket.acquire(1)
+    assert time.monotonic() - start >= 0.15
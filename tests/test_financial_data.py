@@ -0,0 +1,39 @@
+# tests/test_financial_data.py
+import numpy as np
+import pandas as pd
+
+from core.analysis_engine import cached_macro_context
+from core.data_providers import SyntheticProvider
+from core.financial_data import derived_series
+from core.resampling import get_bars
+
+
+def _history() -> pd.DataFrame:
+    provider = SyntheticProvider(seed=9, origin="2022-01-03", history_days=None, end="2022-12-30")
+    return provider.fetch(["AAA"], "1d", period="max")["AAA"]
+
+
+def _edit_before_last(df: pd.DataFrame) -> None:
+    # Misma longitud, misma última barra: la versión por última barra no cambia
+    df.loc[df.index[:-1], "Close"] *= 1.5
+
+
+def test_anonymous_frames_are_not_served_from_cache():
+    df = _history()
+    before = derived_series(df)["ret"].to_numpy().copy()
+    weekly = get_bars(df, "W")["Close"].to_numpy().copy()
+    ctx, _ = cached_macro_context("ANON", df)
+
+    _edit_before_last(df)
+
+    assert not np.allclose(derived_series(df)["ret"].to_numpy(), before, equal_nan=True)
+    assert not np.allclose(get_bars(df, "W")["Close"].to_numpy(), weekly)
+    assert cached_macro_context("ANON", df)[0] != ctx
+
+
+def test_ticker_frames_are_cached():
+    df = _history()
+    df.attrs["ticker"] = "CACHED"
+    assert derived_series(df) is derived_series(df)
+    assert get_bars(df, "W") is get_bars(df, "W")
+    assert cached_macro_context("CACHED", df) is cached_macro_context("CACHED", df)
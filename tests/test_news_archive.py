@@ -0,0 +1,41 @@
+# tests/test_news_archive.py
+import core.news_fetcher as nf
+from core.news_archive import NewsArchive
+from tests.fake_marketaux import FakeSession, make_articles
+
+
+def _links(archive: NewsArchive, ticker: str) -> set:
+    return {a["link"] for a in archive.search(ticker=ticker, limit=1000)}
+
+
+def test_add_does_not_move_the_backfill_cursor(monkeypatch):
+    articles = make_articles({"AAA": 8})
+    monkeypatch.setattr(nf, "get_session", lambda: FakeSession(articles))
+    archive = NewsArchive(":memory:")
+
+    # Los más recientes de una consulta suelta no cuentan como backfill
+    latest = nf.fetch_news_bulk(["AAA"], limit=3, use_cache=False)["AAA"]
+    archive.add("AAA", latest)
+    assert archive.backfill_cursor("AAA") is None
+
+    archive.backfill(["AAA"])
+    assert len(_links(archive, "AAA")) == 8
+    assert archive.backfill_cursor("AAA") == max(a["published_at"] for a in articles)
+
+
+def test_capped_backfill_resumes_without_gaps(monkeypatch):
+    articles = make_articles({"AAA": 7, "BBB": 3})
+    monkeypatch.setattr(nf, "get_session", lambda: FakeSession(articles, plan_cap=2))
+    archive = NewsArchive(":memory:")
+
+    # 2 páginas de 2: llegan las 4 más antiguas del grupo
+    archive.backfill(["AAA", "BBB"], max_pages=2)
+    assert archive.count() == 4
+    oldest = sorted(a["published_at"] for a in articles)
+    assert archive.backfill_cursor("AAA") == archive.backfill_cursor("BBB") == oldest[3]
+
+    archive.backfill(["AAA", "BBB"], max_pages=2)
+    archive.backfill(["AAA", "BBB"], max_pages=2)
+    assert len(_links(archive, "AAA")) == 7
+    assert len(_links(archive, "BBB")) == 3
+    assert archive.backfill_cursor("AAA") == oldest[-1]
@@ -0,0 +1,81 @@
+# tests/test_news_fetcher.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+import core.news_fetcher as nf
+from tests.fake_marketaux import FakeSession, make_articles
+
+
+@pytest.fixture
+def news_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(nf, "_news_cache", {})
+    monkeypatch.setattr(nf, "_news_cache_loaded", True)
+    monkeypatch.setattr(nf, "NEWS_CACHE_FILE", str(tmp_path / "news_cache.json"))
+    return nf._news_cache
+
+
+def _use_session(monkeypatch, session: FakeSession) -> FakeSession:
+    monkeypatch.setattr(nf, "get_session", lambda: session)
+    return session
+
+
+async def _collect(gen) -> list:
+    return [res async for res in gen]
+
+
+def test_async_deadline_does_not_wait_for_stuck_worker(monkeypatch):
+    release = threading.Event()
+
+    def stuck(tickers, limit, days, timeout):
+        release.wait(5)
+        return {t: [] for t in tickers}, True, set(tickers)
+
+    monkeypatch.setattr(nf, "_fetch_news_uncached", stuck)
+    monkeypatch.setattr(nf, "cached_news", lambda *args, **kwargs: None)
+
+    start = time.perf_counter()
+    results = asyncio.run(_collect(nf.fetch_news_async(["AAA", "BBB"], deadline=0.2)))
+    elapsed = time.perf_counter() - start
+    release.set()
+
+    assert elapsed < 1.0
+    assert sorted(r["ticker"] for r in results) == ["AAA", "BBB"]
+    assert all(r["error"] == "sin respuesta en 0.2s" for r in results)
+
+
+def test_only_complete_tickers_are_cached(monkeypatch, news_cache):
+    # Una sola ronda y páginas de 3: AAA llena su 'limit', BBB queda corto
+    monkeypatch.setattr(nf, "NEWS_BULK_ROUNDS", 1)
+    session = _use_session(monkeypatch, FakeSession(make_articles({"AAA": 2, "BBB": 10}), plan_cap=3))
+
+    news = nf.fetch_news_bulk(["AAA", "BBB"], limit=2)
+    assert len(news["AAA"]) == 2 and len(news["BBB"]) == 1
+    assert nf.cached_news("AAA", 2) is not None
+    assert nf.cached_news("BBB", 2) is None
+
+    # La siguiente llamada solo vuelve a pedir el incompleto
+    nf.fetch_news_bulk(["AAA", "BBB"], limit=2)
+    assert session.calls[-1]["symbols"] == "BBB"
+
+
+def test_exhausted_query_is_cached_even_if_short(monkeypatch, news_cache):
+    _use_session(monkeypatch, FakeSession(make_articles({"AAA": 1})))
+
+    news = nf.fetch_news_bulk(["AAA"], limit=3)
+    assert len(news["AAA"]) == 1
+    assert nf.cached_news("AAA", 3) == news["AAA"]
+
+
+def test_failed_request_is_not_cached(monkeypatch, news_cache):
+    session = _use_session(monkeypatch, FakeSession([], fail=True))
+
+    assert nf.fetch_news_bulk(["AAA"], limit=3) == {"AAA": []}
+    assert news_cache == {}
+
+    results = asyncio.run(_collect(nf.fetch_news_async(["AAA"], limit=3)))
+    assert results[0]["error"] == "la petición falló"
+    assert news_cache == {}
+    assert len(session.calls) == 2
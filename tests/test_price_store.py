@@ -0,0 +1,106 @@
+# tests/test_price_store.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.data_providers import MarketDataProvider, SyntheticProvider, get_provider, set_provider
+from core.financial_data import update_store
+from core.price_store import PriceStore
+
+TICKERS = ["AAA", "BBB"]
+
+
+class _AdjustingProvider(MarketDataProvider):
+    """
+    Sintético con retoques: 'splits' aplica un split en la fecha indicada
+    (las barras nuevas cotizan divididas y, como hace Yahoo, el histórico
+    servido desde entonces se reajusta entero); 'partial' cambia solo la
+    última barra, como una barra diaria incompleta que luego cierra.
+    """
+
+    name = "adjusting"
+
+    def __init__(self, end: str):
+        self.base = SyntheticProvider(seed=3, origin="2020-01-01", history_days=None, end=end)
+        self.splits: dict[str, tuple[pd.Timestamp, float]] = {}
+        self.partial: dict[str, float] = {}
+        self.calls: list[tuple[tuple, object]] = []
+
+    def fetch(self, tickers, interval, period=None, start=None):
+        self.calls.append((tuple(tickers), start))
+        data = self.base.fetch(tickers, interval, period=period, start=start)
+        for t, df in data.items():
+            if t in self.splits:
+                date, ratio = self.splits[t]
+                if self.base.end >= date:
+                    df[["Open", "High", "Low", "Close", "Adj Close"]] /= ratio
+            if t in self.partial:
+                df.loc[df.index[-1], ["Close", "Adj Close"]] *= self.partial[t]
+        return data
+
+
+@pytest.fixture
+def provider():
+    previous = get_provider()
+    yield _AdjustingProvider
+    set_provider(previous)
+
+
+def _returns(store: PriceStore, ticker: str) -> pd.Series:
+    return store.load(ticker, "1d")["Close"].pct_change().dropna()
+
+
+def test_warm_refresh_appends_only_new_bars(provider):
+    store = PriceStore("sqlite://")
+    set_provider(provider("2024-03-01"))
+    update_store(TICKERS, period="max", store=store)
+
+    source = provider("2024-03-08")
+    set_provider(source)
+    charged = []
+    report = update_store(TICKERS, period="max", store=store, throttle=charged.append)
+
+    assert report["reloaded"] == []
+    assert charged == [len(TICKERS)]
+    assert source.calls == [(tuple(TICKERS), pd.Timestamp("2024-02-29"))]
+    expected = source.base.fetch(["AAA"], "1d", period="max")["AAA"]
+    pd.testing.assert_series_equal(
+        store.load("AAA", "1d")["Close"], expected["Close"].reset_index(drop=True), check_dtype=False
+    )
+
+
+def test_split_adjusted_history_triggers_full_reload(provider):
+    store = PriceStore("sqlite://")
+    set_provider(provider("2024-03-01"))
+    update_store(TICKERS, period="max", store=store)
+
+    # Split 10:1 el 2024-03-05: Yahoo reescribe todo el histórico anterior
+    source = provider("2024-03-08")
+    source.splits["AAA"] = (pd.Timestamp("2024-03-05"), 10.0)
+    set_provider(source)
+    report = update_store(TICKERS, period="max", store=store)
+
+    assert report["reloaded"] == ["AAA"]
+    assert report["errors"] == {} and report["stale"] == {}
+    assert _returns(store, "AAA").abs().max() < 0.5
+    expected = source.fetch(["AAA"], "1d", period="max")["AAA"]
+    np.testing.assert_allclose(store.load("AAA", "1d")["Adj Close"], expected["Adj Close"])
+    assert len(store.load("BBB", "1d")) == len(expected)
+
+
+def test_partial_last_bar_is_replaced_without_reload(provider):
+    store = PriceStore("sqlite://")
+    source = provider("2024-03-01")
+    source.partial["AAA"] = 1.001
+    set_provider(source)
+    update_store(TICKERS, period="max", store=store)
+
+    # La barra del 2024-03-01 estaba incompleta: al cerrar cae un 10%
+    source = provider("2024-03-01")
+    source.partial["AAA"] = 0.9
+    set_provider(source)
+    report = update_store(TICKERS, period="max", store=store)
+
+    assert report["reloaded"] == []
+    closed = source.fetch(["AAA"], "1d", period="max")["AAA"]
+    assert store.load("AAA", "1d")["Close"].iloc[-1] == pytest.approx(closed["Close"].iloc[-1])
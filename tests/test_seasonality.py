@@ -0,0 +1,69 @@
+# tests/test_seasonality.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.financial_data import seasonality_table
+from core.seasonality import SeasonalityCube
+
+DIMS = {"month": lambda d: d.month, "weekday": lambda d: d.weekday, "day": lambda d: d.day}
+
+
+def _history(n: int, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"date": pd.bdate_range("2018-01-01", periods=n), "Close": close})
+
+
+def _groupby_table(df: pd.DataFrame, dim: str) -> pd.DataFrame:
+    # Cálculo completo original (seasonality_by_month / weekday / month_day)
+    ret = df["Close"].pct_change()
+    grouped = (
+        pd.DataFrame({dim: DIMS[dim](df["date"].dt), "ret": ret})
+        .groupby(dim)["ret"]
+        .agg(avg_return="mean", count="count")
+        .reset_index()
+        .sort_values(dim)
+    )
+    return grouped
+
+
+def _assert_same(table: pd.DataFrame, expected: pd.DataFrame, dim: str) -> None:
+    np.testing.assert_array_equal(table[dim].to_numpy(), expected[dim].to_numpy())
+    np.testing.assert_array_equal(table["count"].to_numpy(), expected["count"].to_numpy())
+    np.testing.assert_allclose(table["avg_return"], expected["avg_return"], rtol=1e-9, atol=1e-15)
+
+
+@pytest.mark.parametrize("dim", list(DIMS))
+def test_cube_matches_groupby(dim):
+    df = _history(900)
+    cube = SeasonalityCube.from_arrays(df["date"], df["Close"])
+    _assert_same(cube.table(dim), _groupby_table(df, dim), dim)
+
+
+@pytest.mark.parametrize("dim", list(DIMS))
+def test_incremental_bars_match_full_build(dim):
+    df = _history(700)
+    cube = SeasonalityCube.from_arrays(df["date"][:400], df["Close"][:400])
+    for date, close in zip(df["date"][400:], df["Close"][400:]):
+        cube.add_bar(date, close)
+    _assert_same(cube.table(dim), _groupby_table(df, dim), dim)
+
+
+def test_replacing_last_bar_matches_corrected_history():
+    df = _history(300)
+    cube = SeasonalityCube.from_arrays(df["date"], df["Close"])
+    corrected = df.copy()
+    corrected.loc[corrected.index[-1], "Close"] *= 1.03
+    cube.add_bar(corrected["date"].iloc[-1], corrected["Close"].iloc[-1])
+    assert cube.n_bars == len(df)
+    for dim in DIMS:
+        _assert_same(cube.table(dim), _groupby_table(corrected, dim), dim)
+
+
+def test_shared_cube_follows_a_growing_history():
+    df = _history(500)
+    for n in (200, 201, 350, 500):
+        prefix = df.iloc[:n].copy()
+        prefix.attrs["ticker"] = "TEST_SEASONALITY"
+        _assert_same(seasonality_table(prefix, "month"), _groupby_table(prefix, "month"), "month")
@@ -0,0 +1,87 @@
+# tests/test_streaming_indicators.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.analysis_engine import detect_return_anomaly
+from core.financial_data import compute_volatility, compute_momentum
+from core.resampling import get_bars
+from core.streaming_indicators import RESYNC_EVERY, RollingWindowStats, StreamingIndicators
+
+
+def _history(n: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    return pd.DataFrame({"date": pd.bdate_range("2020-01-01", periods=n), "Close": close})
+
+
+def test_rolling_window_matches_numpy_after_wrap_and_resync():
+    rng = np.random.default_rng(1)
+    values = rng.normal(0.001, 0.02, RESYNC_EVERY * 2 + 37)
+    stats = RollingWindowStats(20)
+    for i, x in enumerate(values, start=1):
+        stats.push(x)
+        if i in (1, 2, 19, 20, 21, RESYNC_EVERY + 20, len(values)):
+            window = values[max(0, i - 20):i]
+            assert stats.count == len(window)
+            assert stats.mean == pytest.approx(window.mean(), abs=1e-12)
+            if len(window) >= 2:
+                assert stats.variance == pytest.approx(window.var(ddof=1), rel=1e-9)
+
+
+def test_streaming_indicators_match_full_recompute():
+    df = _history(300)
+    state = StreamingIndicators()
+    for i, close in enumerate(df["Close"], start=1):
+        state.update(close)
+        if i in (3, 11, 25, 150, 300):
+            prefix = df.iloc[:i]
+            np.testing.assert_allclose(state.volatility(), compute_volatility(prefix), rtol=1e-9, equal_nan=True)
+            np.testing.assert_allclose(state.momentum(), compute_momentum(prefix), rtol=1e-12, equal_nan=True)
+            expected = detect_return_anomaly(prefix)
+            got = state.anomaly()
+            assert got["anomaly"] == expected["anomaly"]
+            assert got["sigma"] == pytest.approx(expected["sigma"], rel=1e-9, abs=1e-12)
+
+
+def test_from_history_equals_bar_by_bar():
+    df = _history(120)
+    replayed = StreamingIndicators()
+    for close in df["Close"]:
+        replayed.update(close)
+    assert StreamingIndicators.from_history(df).snapshot() == replayed.snapshot()
+
+
+def test_replace_last_equals_feeding_the_final_close():
+    df = _history(80)
+    closes = df["Close"].to_numpy()
+    for n in (1, 2, 15, 80):
+        state = StreamingIndicators()
+        for close in closes[: n - 1]:
+            state.update(close)
+        state.update(closes[n - 1] * 1.001)
+        state.replace_last(closes[n - 1] * 0.9)
+
+        expected = StreamingIndicators()
+        for close in closes[: n - 1]:
+            expected.update(close)
+        expected.update(closes[n - 1] * 0.9)
+
+        assert state.last_close == expected.last_close
+        np.testing.assert_allclose(state.volatility(), expected.volatility(), rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(state.momentum(), expected.momentum(), rtol=1e-12, equal_nan=True)
+        assert state.anomaly()["sigma"] == pytest.approx(expected.anomaly()["sigma"], rel=1e-9, abs=1e-12)
+
+
+def test_volatility_uses_the_bars_per_year_of_the_history():
+    df = _history(400)
+    df.attrs["ticker"] = "WEEKLY"
+    weekly = get_bars(df, "W")
+    state = StreamingIndicators.from_history(weekly, vol_window=10)
+    assert state.periods_per_year == 52
+    assert state.volatility() == pytest.approx(compute_volatility(weekly, window=10), rel=1e-9)
+
+    hourly = StreamingIndicators(periods_per_year=252 * 6.5)
+    for close in df["Close"]:
+        hourly.update(close)
+    assert hourly.volatility() == pytest.approx(hourly.volatility(annualize=False) * (252 * 6.5) ** 0.5)